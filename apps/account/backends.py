@@ -1,9 +1,13 @@
-from django.contrib.auth import get_user_model
+from typing import Union
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_backends, get_user_model
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.backends import ModelBackend as _ModelBackend
 from django.core.cache import cache
 
 from apps.account.models import User
+from core.async_cache import async_cache
 
 USER_MODEL: User = get_user_model()
 
@@ -28,6 +32,21 @@ class ModelBackend(_ModelBackend):
         if user.check_password(password):
             return user
 
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        # Check Username and Password
+        if not username:
+            username = kwargs.get(USER_MODEL.USERNAME_FIELD)
+        if not username and not password:
+            return None
+        # Retrieve User
+        try:
+            user = await USER_MODEL.objects.aget_cache_instance(username)
+        except USER_MODEL.DoesNotExist:
+            return None
+        # Check Password, hashing would block event loop
+        if await sync_to_async(user.check_password)(password):
+            return user
+
 
 class TokenBackend(BaseBackend):
     """
@@ -47,3 +66,33 @@ class TokenBackend(BaseBackend):
             return USER_MODEL.objects.get(username=username)
         except USER_MODEL.DoesNotExist:
             return None
+
+    async def aauthenticate(self, request, token=None, **kwargs):
+        # Check Token Exist
+        if not token:
+            return None
+        # Retrieve Username
+        username = await async_cache.get(token)
+        if not username:
+            return None
+        # Retrieve User
+        try:
+            return await USER_MODEL.objects.filter(username=username).aget()
+        except USER_MODEL.DoesNotExist:
+            return None
+
+
+async def aauthenticate(request, **credentials) -> Union[User, None]:
+    """
+    authenticate with backends in event loop, backends without aauthenticate run in thread
+    """
+
+    for backend in get_backends():
+        if hasattr(backend, "aauthenticate"):
+            user = await backend.aauthenticate(request, **credentials)
+        else:
+            user = await sync_to_async(backend.authenticate)(request, **credentials)
+        if user is not None:
+            user.backend = f"{backend.__module__}.{backend.__class__.__name__}"
+            return user
+    return None
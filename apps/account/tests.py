@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.account.models import User
+from core.utils import get_auth_token
+
+
+class AccountQueryBudgetTestCase(TestCase):
+    """
+    budgeted account actions run in strict mode with cold cache, so exceeding budget fails the test
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", f"User{i}", "password") for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.cookies[settings.AUTH_TOKEN_NAME] = get_auth_token(self.users[0].username)
+
+    def test_user_search(self):
+        response = self.client.get("/account/user_search/", {"keyword": "user"})
+        self.assertEqual(response.status_code, 200)
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from apps.account.backends import aauthenticate
 from apps.account.exceptions import WrongSignInParam, WrongToken
 from apps.account.models import User, UserProperty
 from apps.account.serializers import (
@@ -21,13 +22,14 @@ from apps.account.serializers import (
     VerifyUserTokenRequestSerializer,
 )
 from core.auth import ApplicationAuthenticate, SessionAuthenticate
+from core.query_budget import query_budget
 from core.utils import get_auth_token, remove_auth_token
-from core.viewsets import ListMixin, MainViewSet
+from core.viewsets import AsyncMainViewSet, ListMixin, MainViewSet
 
 USER_MODEL: User = get_user_model()
 
 
-class UserInfoViewSet(MainViewSet):
+class UserInfoViewSet(AsyncMainViewSet):
     """
     User Info
     """
@@ -43,6 +45,13 @@ class UserInfoViewSet(MainViewSet):
         serializer = self.get_serializer(instance=request.user)
         return Response(serializer.data)
 
+    async def alist(self, request, *args, **kwargs):
+        """
+        Get User Info in Event Loop
+        """
+
+        return self.list(request, *args, **kwargs)
+
 
 class UserPropertyViewSet(MainViewSet):
     """
@@ -102,7 +111,7 @@ class UserPropertyViewSet(MainViewSet):
         return Response()
 
 
-class UserSignViewSet(MainViewSet):
+class UserSignViewSet(AsyncMainViewSet):
     """
     User Login and Logout
     """
@@ -199,6 +208,25 @@ class UserSignViewSet(MainViewSet):
         serializer = UserInfoSerializer(instance=user)
         return Response(serializer.data)
 
+    async def averify_token(self, request, *args, **kwargs):
+        """
+        Verify User Token in Event Loop
+        """
+
+        # Validate Request Data
+        request_serializer = VerifyUserTokenRequestSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+        request_data = request_serializer.validated_data
+
+        # Check Token
+        user = await aauthenticate(request, **request_data)
+        if not user:
+            raise WrongToken()
+
+        # Response
+        serializer = UserInfoSerializer(instance=user)
+        return Response(serializer.data)
+
 
 class UserSearchViewSet(ListMixin, MainViewSet):
     """
@@ -207,6 +235,7 @@ class UserSearchViewSet(ListMixin, MainViewSet):
 
     queryset = USER_MODEL.get_queryset()
 
+    @query_budget(2)
     def list(self, request, *args, **kwargs):
         """
         search
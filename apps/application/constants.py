@@ -1 +1,11 @@
 APP_CODE_REGEXP = r"^[a-zA-Z0-9-_]+$"
+
+
+class ApplicationCacheKey:
+    """
+    Application Cache Key
+    """
+
+    MANAGED_APPS = "managed-apps:{username}"
+    MANAGED_APPS_VERSION = "managed-apps-version"
+    MANAGED_APPS_MAX_SIZE = 10000
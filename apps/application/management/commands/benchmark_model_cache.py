@@ -0,0 +1,117 @@
+import json
+import pickle
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from apps.application.models import Application
+from core.benchmark import benchmark_environment, format_results, run_benchmark
+from core.model_cache import model_cache, model_codec
+
+USER_MODEL = get_user_model()
+
+BENCHMARK_PREFIX = "bench"
+BENCHMARK_SECRET = "benchmark"
+
+# expected queries per lookup
+QUERY_BUDGET = {"cold": 1, "warm": 0}
+
+
+def pickle_encode(instance) -> any:
+    return instance
+
+
+def pickle_decode(data: any) -> any:
+    return data
+
+
+class Command(BaseCommand):
+    """
+    Benchmark get_cache_instance for Existing and Missing Instance with Cold and Warm Cache
+    fails when queries per lookup exceed budget, and compares size and decoding of model codec against pickle
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--use-redis", action="store_true")
+        parser.add_argument("--output", type=str, default="")
+
+    def handle(self, *args, **options):
+        with benchmark_environment(use_redis=options["use_redis"]):
+            self.seed_data()
+            results = []
+            for (model, pk, missing) in [
+                (USER_MODEL, self.user.pk, False),
+                (USER_MODEL, f"{BENCHMARK_PREFIX}-missing", True),
+                (Application, self.application.pk, False),
+                (Application, f"{BENCHMARK_PREFIX}-missing", True),
+            ]:
+                name = f"{model.__name__.lower()}-{'missing' if missing else 'exist'}"
+                results.append(run_benchmark(f"{name}-cold", self.lookup(model, pk, True), options["iterations"]))
+                results.append(run_benchmark(f"{name}-warm", self.lookup(model, pk, False), options["iterations"]))
+            sizes = {}
+            for instance in [self.user, self.application]:
+                name = instance.__class__.__name__.lower()
+                for (codec, encode, decode) in [
+                    ("pickle", pickle_encode, pickle_decode),
+                    ("codec", model_codec.encode, lambda data: model_codec.decode(instance.__class__, data)),
+                ]:
+                    data = encode(instance)
+                    sizes[f"{name}-{codec}"] = len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+                    results.append(
+                        run_benchmark(f"{name}-{codec}-decode", self.decode(data, decode), options["iterations"])
+                    )
+        self.stdout.write(format_results(results))
+        self.stdout.write("\n".join(f"[{name}] Size => {size} bytes" for (name, size) in sizes.items()))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(
+                    {"options": options, "results": [r._asdict() for r in results], "sizes": sizes}, file, indent=2
+                )
+        self.check_budget(results)
+
+    def seed_data(self) -> None:
+        self.user = USER_MODEL.objects.create_user(
+            username=f"{BENCHMARK_PREFIX}-u0", nick_name=f"{BENCHMARK_PREFIX}-u0"
+        )
+        self.application = Application.objects.create(
+            app_name=f"{BENCHMARK_PREFIX}-app0",
+            app_code=f"{BENCHMARK_PREFIX}-app0",
+            app_secret=BENCHMARK_SECRET,
+            managers=[self.user],
+        )
+
+    def lookup(self, model, pk: str, cold: bool) -> callable:
+        """
+        build lookup func, cache is removed before each call if cold
+        """
+
+        cache_key = model.cache_key(pk)
+
+        def func(index: int) -> None:
+            if cold:
+                model_cache.delete(cache_key)
+            try:
+                model.objects.get_cache_instance(pk)
+            except model.DoesNotExist:
+                pass
+
+        return func
+
+    def decode(self, data: any, decode: callable) -> callable:
+        """
+        build decode func, data is stored as pickled bytes like in cache
+        """
+
+        data = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+        def func(index: int) -> None:
+            decode(pickle.loads(data))
+
+        return func
+
+    def check_budget(self, results: list) -> None:
+        for result in results:
+            budget = QUERY_BUDGET.get(result.name.rsplit("-", 1)[-1])
+            if budget is not None and result.queries > budget:
+                raise CommandError(f"[BenchmarkModelCache] {result.name} => {result.queries} queries > {budget}")
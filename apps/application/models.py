@@ -1,14 +1,19 @@
-from typing import List
+from typing import Dict, FrozenSet, Iterable, List
 
 from django.conf import settings
 from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
 from django.db import models, transaction
 from django.utils.translation import gettext_lazy
 
 from apps.account.models import User
+from apps.application.constants import ApplicationCacheKey
+from core.cache import VersionedLocalCache
 from core.constants import SHORT_CHAR_LENGTH
+from core.model_cache import model_cache
 from core.models import (
     BaseModel,
+    BaseModelManager,
     ForeignKey,
     SoftDeletedManager,
     SoftDeletedModel,
@@ -36,6 +41,7 @@ class ApplicationObjects(SoftDeletedManager):
         # set managers
         app_managers = [ApplicationManager(application=application, manager=manager) for manager in managers]
         ApplicationManager.objects.bulk_create(app_managers)
+        ApplicationManager.objects.remove_managed_apps_cache([manager.username for manager in managers])
 
         return application
 
@@ -79,6 +85,65 @@ class Application(SoftDeletedModel):
         self.save(update_fields=["app_secret"])
 
 
+class ApplicationManagerObjects(BaseModelManager):
+    """
+    Application Manager Objects
+    managed apps of each user are cached in redis and process local cache
+    """
+
+    managed_apps_index = VersionedLocalCache(
+        ApplicationCacheKey.MANAGED_APPS_VERSION, ApplicationCacheKey.MANAGED_APPS_MAX_SIZE
+    )
+
+    def is_manager(self, application_id: str, username: str) -> bool:
+        """
+        check user is manager of application
+        """
+
+        return application_id in self.get_managed_apps(username)
+
+    def get_managed_apps(self, username: str) -> FrozenSet[str]:
+        """
+        app codes managed by user
+        """
+
+        return self.managed_apps_index.load([username], self._load_managed_apps)[username]
+
+    def remove_managed_apps_cache(self, usernames: Iterable[str]) -> None:
+        """
+        remove cache after current transaction committed
+        """
+
+        cache_keys = [self._cache_key(username) for username in set(usernames)]
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+        self.managed_apps_index.bump_version()
+        model_cache.bump_generation(self.model)
+
+    def _cache_key(self, username: str) -> str:
+        return ApplicationCacheKey.MANAGED_APPS.format(username=username)
+
+    def _load_managed_apps(self, usernames: List[str]) -> Dict[str, FrozenSet[str]]:
+        # redis
+        cache_keys = {self._cache_key(username): username for username in usernames}
+        managed_apps = {cache_keys[key]: frozenset(apps) for (key, apps) in cache.get_many(cache_keys.keys()).items()}
+
+        # database
+        missing = [username for username in usernames if username not in managed_apps]
+        if not missing:
+            return managed_apps
+        loaded = {username: set() for username in missing}
+        for (username, application_id) in self.filter(manager_id__in=missing).values_list(
+            "manager_id", "application_id"
+        ):
+            loaded[username].add(application_id)
+        cache.set_many(
+            {self._cache_key(username): list(apps) for (username, apps) in loaded.items()},
+            timeout=self.model.cache_timeout,
+        )
+        managed_apps.update({username: frozenset(apps) for (username, apps) in loaded.items()})
+        return managed_apps
+
+
 class ApplicationManager(BaseModel):
     """
     Application Manager
@@ -88,8 +153,18 @@ class ApplicationManager(BaseModel):
     application = ForeignKey(gettext_lazy("Application"), to="application.Application", on_delete=models.CASCADE)
     manager = ForeignKey(gettext_lazy("Manager"), to="account.User", on_delete=models.CASCADE)
 
+    objects = ApplicationManagerObjects()
+
     class Meta:
         verbose_name = gettext_lazy("Application Manager")
         verbose_name_plural = verbose_name
         unique_together = ["application", "manager"]
         ordering = ["id"]
+
+    def save(self, *args, **kwargs) -> None:
+        ApplicationManager.objects.remove_managed_apps_cache([self.manager_id])
+        return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs) -> None:
+        ApplicationManager.objects.remove_managed_apps_cache([self.manager_id])
+        return super().delete(*args, **kwargs)
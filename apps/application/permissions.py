@@ -22,6 +22,6 @@ class ApplicationManagePermission(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj: Application):
-        if ApplicationManager.objects.filter(application=obj, manager=request.user).exists():
+        if ApplicationManager.objects.is_manager(obj.app_code, request.user.username):
             return True
         raise PermissionDenied(gettext_lazy("App Manager Permission Required"))
@@ -107,11 +107,17 @@ class ApplicationUpdateRequestSerializer(ApplicationCreateSerializer):
 
         # update managers
         if validated_data.get("managers"):
+            old_managers = list(
+                ApplicationManager.objects.filter(application=instance).values_list("manager_id", flat=True)
+            )
             ApplicationManager.objects.filter(application=instance).delete()
             app_managers = [
                 ApplicationManager(application=instance, manager=manager) for manager in validated_data["managers"]
             ]
             ApplicationManager.objects.bulk_create(app_managers)
+            ApplicationManager.objects.remove_managed_apps_cache(
+                old_managers + [manager.username for manager in validated_data["managers"]]
+            )
 
         return instance
 
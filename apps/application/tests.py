@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.account.models import User
+from apps.application.models import Application, ApplicationManager
+from core.utils import get_auth_token
+
+
+class ApplicationQueryBudgetTestCase(TestCase):
+    """
+    budgeted application actions run in strict mode with cold cache, so exceeding budget fails the test
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", f"User{i}", "password") for i in range(3)]
+        for i in range(5):
+            Application.objects.create(app_name=f"App{i}", app_code=f"app{i}", app_secret="secret", managers=cls.users)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.cookies[settings.AUTH_TOKEN_NAME] = get_auth_token(self.users[0].username)
+
+    def test_application_list(self):
+        response = self.client.get("/application/")
+        self.assertEqual(response.status_code, 200)
+
+
+class ManagedAppsTestCase(TestCase):
+    """
+    managed apps are cached in local index and redis, and invalidated when managers changed
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", f"User{i}", "password") for i in range(2)]
+        cls.app = Application.objects.create(
+            app_name="App", app_code="app", app_secret="secret", managers=[cls.users[0]]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.cookies[settings.AUTH_TOKEN_NAME] = get_auth_token(self.users[0].username)
+
+    def get_managed_apps(self, user: User) -> frozenset:
+        return ApplicationManager.objects.get_managed_apps(user.username)
+
+    def test_cached(self):
+        self.assertEqual(self.get_managed_apps(self.users[0]), {self.app.app_code})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_managed_apps(self.users[0]), {self.app.app_code})
+
+    def test_invalidated_after_create(self):
+        self.assertEqual(self.get_managed_apps(self.users[1]), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            app = Application.objects.create(
+                app_name="New", app_code="new", app_secret="secret", managers=[self.users[1]]
+            )
+        self.assertEqual(self.get_managed_apps(self.users[1]), {app.app_code})
+
+    def test_invalidated_after_update(self):
+        self.assertEqual(self.get_managed_apps(self.users[0]), {self.app.app_code})
+        self.assertEqual(self.get_managed_apps(self.users[1]), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/application/{self.app.app_code}/", {"managers": [self.users[1].username]}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_managed_apps(self.users[0]), set())
+        self.assertEqual(self.get_managed_apps(self.users[1]), {self.app.app_code})
+
+    def test_invalidated_after_delete(self):
+        self.assertEqual(self.get_managed_apps(self.users[0]), {self.app.app_code})
+        with self.captureOnCommitCallbacks(execute=True):
+            ApplicationManager.objects.get(application=self.app, manager=self.users[0]).delete()
+        self.assertEqual(self.get_managed_apps(self.users[0]), set())
@@ -18,7 +18,8 @@ from apps.application.serializers import (
     ApplicationUpdateRequestSerializer,
     ApplicationUpdateResponseSerializer,
 )
-from core.constants import ViewActionChoices
+from core.constants import LONG_CACHE_TIMEOUT, ViewActionChoices
+from core.query_budget import query_budget
 from core.viewsets import CreateMixin, DestroyMixin, ListMixin, MainViewSet, UpdateMixin
 
 USER_MODEL: User = get_user_model()
@@ -39,6 +40,7 @@ class ApplicationViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, Main
             return [ApplicationManagePermission()]
         return [ApplicationAdminPermission()]
 
+    @query_budget(4)
     def list(self, request, *args, **kwargs):
         """
         Application List
@@ -94,7 +96,14 @@ class ApplicationViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, Main
         serializer = ApplicationUpdateResponseSerializer(instance)
         return Response(serializer.data)
 
-    @action(methods=["GET"], detail=False, pagination_class=None)
+    @action(
+        methods=["GET"],
+        detail=False,
+        pagination_class=None,
+        enable_cache=True,
+        cache_timeout=LONG_CACHE_TIMEOUT,
+        cache_models=[Application, ApplicationManager],
+    )
     def all(self, request, *args, **kwargs):
         """
         list all applications
@@ -108,7 +117,7 @@ class ApplicationViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, Main
         # filter
         queryset = Application.get_queryset()
         if request_data["is_manager"]:
-            managed_apps = ApplicationManager.objects.filter(manager=request.user).values("application")
+            managed_apps = ApplicationManager.objects.get_managed_apps(request.user.username)
             queryset = queryset.filter(app_code__in=managed_apps)
 
         # response
@@ -18,4 +18,9 @@ app.conf.beat_schedule = {
         "schedule": crontab(minute="*"),
         "args": (),
     },
+    "assign_permission_change_cursors": {
+        "task": "apps.cel.tasks.iam.assign_permission_change_cursors",
+        "schedule": crontab(minute="*"),
+        "args": (),
+    },
 }
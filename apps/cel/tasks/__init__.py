@@ -1,7 +1,9 @@
 from apps.cel.tasks.debug import celery_debug
+from apps.cel.tasks.iam import assign_permission_change_cursors
 from apps.cel.tasks.notice import send_notice
 
 __all__ = [
     "celery_debug",
+    "assign_permission_change_cursors",
     "send_notice",
 ]
@@ -0,0 +1,21 @@
+from apps.cel import app
+from apps.cel.utils import task_lock
+from core.logger import celery_logger
+
+
+@app.task(bind=True)
+@task_lock()
+def assign_permission_change_cursors(self):
+    """
+    assign cursors to committed changes missed by on commit, such as the process exited after committed
+    """
+
+    from apps.iam.models import PermissionChange
+    from apps.iam.utils import assign_change_cursors
+
+    celery_logger.info(f"[AssignPermissionChangeCursors] Start {self.request.id}")
+    application_ids = set(
+        PermissionChange.objects.filter(cursor__isnull=True).values_list("application_id", flat=True).distinct()
+    )
+    assign_change_cursors(application_ids)
+    celery_logger.info(f"[AssignPermissionChangeCursors] End {self.request.id}; Applications => {application_ids}")
@@ -0,0 +1,82 @@
+import time
+from collections import defaultdict
+
+from django.core.management import BaseCommand
+
+from core.access_log import AccessLogWriter
+from core.benchmark import percentile
+
+
+class Command(BaseCommand):
+    """
+    Tail or Aggregate Structured Access Log
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=int, default=60, help="minutes")
+        parser.add_argument("--tail", type=int, default=0, help="print last n records instead of aggregation")
+        parser.add_argument("--path", type=str, default="", help="path prefix")
+        parser.add_argument("--sort", type=str, default="count", choices=["count", "p50", "p95", "p99", "errors"])
+        parser.add_argument("--limit", type=int, default=50)
+
+    def handle(self, *args, **options):
+        records = [
+            record
+            for record in AccessLogWriter.read(time.time() - options["since"] * 60)
+            if record.path.startswith(options["path"])
+        ]
+        if options["tail"]:
+            self.tail(sorted(records, key=lambda record: record.timestamp)[-options["tail"] :])
+        else:
+            self.aggregate(records, options["sort"], options["limit"])
+
+    def tail(self, records: list) -> None:
+        for record in records:
+            self.stdout.write(
+                "{} {:<16} {:<6} {} {} {:.1f}ms {}B {}".format(
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp)),
+                    record.user,
+                    record.method,
+                    record.path,
+                    record.status,
+                    record.latency,
+                    record.response_size,
+                    record.trace_id,
+                )
+            )
+
+    def aggregate(self, records: list, sort: str, limit: int) -> None:
+        """
+        latency percentiles, server errors and average response size for each method and route
+        """
+
+        groups = defaultdict(list)
+        for record in records:
+            groups[(record.method, record.route or record.path)].append(record)
+        rows = []
+        for ((method, route), items) in groups.items():
+            latencies = [item.latency for item in items]
+            rows.append(
+                {
+                    "method": method,
+                    "route": route,
+                    "count": len(items),
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "p99": percentile(latencies, 99),
+                    "errors": sum(1 for item in items if item.status >= 500),
+                    "size": sum(item.response_size for item in items) / len(items),
+                }
+            )
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        self.stdout.write(
+            "{:<8}{:<48}{:>8}{:>10}{:>10}{:>10}{:>8}{:>12}".format(
+                "method", "route", "count", "p50(ms)", "p95(ms)", "p99(ms)", "errors", "size(B)"
+            )
+        )
+        for row in rows[:limit]:
+            self.stdout.write(
+                "{method:<8}{route:<48}{count:>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{errors:>8}{size:>12.0f}".format(
+                    **row
+                )
+            )
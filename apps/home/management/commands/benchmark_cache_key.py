@@ -0,0 +1,99 @@
+import json
+import random
+
+from django.core.management import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import format_results, run_benchmark
+from core.cache import CACHE_REQUEST_DIGEST_KEY, CacheItem
+from core.utils import get_md5
+
+
+class Command(BaseCommand):
+    """
+    Benchmark Cache Key of CacheMixin with Large Query String and Request Body
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--params", type=int, default=200)
+        parser.add_argument("--items", type=int, default=100)
+        parser.add_argument("--depth", type=int, default=3)
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", type=str, default="")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.factory = APIRequestFactory()
+        self.params = {f"param{index}": self.random_string() for index in range(options["params"])}
+        self.body = [self.random_body(options["depth"]) for _ in range(options["items"])]
+        results = []
+        for (name, params, body) in [
+            ("query", self.params, None),
+            ("body", {}, self.body),
+        ]:
+            results.append(run_benchmark(f"{name}-md5", self.legacy_key(params, body), options["iterations"]))
+            results.append(run_benchmark(f"{name}-blake2b", self.cache_key(params, body), options["iterations"]))
+            results.append(
+                run_benchmark(f"{name}-blake2b-memoized", self.cache_key(params, body, True), options["iterations"])
+            )
+        self.stdout.write(format_results(results))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump({"options": options, "results": [r._asdict() for r in results]}, file, indent=2)
+
+    def random_string(self) -> str:
+        return "".join(self.random.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=16))
+
+    def random_body(self, depth: int) -> any:
+        if depth <= 0:
+            return self.random.choice([self.random_string(), self.random.randint(0, 1 << 30), None, True])
+        return {"id": self.random_string(), "values": [self.random_body(depth - 1) for _ in range(3)]}
+
+    def build_request(self, params: dict, body: any) -> Request:
+        if body is None:
+            request = self.factory.get("/", params)
+        else:
+            request = self.factory.post(f"/?{'&'.join(f'{k}={v}' for (k, v) in params.items())}", body, format="json")
+        request = Request(request, parsers=[JSONParser()])
+        # parse query string and body outside of measurement
+        getattr(request, "query_params")
+        getattr(request, "data")
+        return request
+
+    def legacy_key(self, params: dict, body: any) -> callable:
+        """
+        nested md5 of each element, computed twice per miss in get_cache and set_cache
+        """
+
+        request = self.build_request(params, body)
+
+        def func(index: int) -> None:
+            for _ in range(2):
+                get_md5(
+                    [
+                        get_md5(request.query_params),
+                        get_md5(request.data),
+                        get_md5(()),
+                        get_md5({}),
+                    ]
+                )
+
+        return func
+
+    def cache_key(self, params: dict, body: any, memoized: bool = False) -> callable:
+        """
+        single pass blake2b, memoized on request after the first call if memoized
+        """
+
+        requests = [self.build_request(params, body) for _ in range(1 if memoized else 64)]
+
+        def func(index: int) -> None:
+            request = requests[0] if memoized else requests[index % len(requests)]
+            if not memoized and hasattr(request, CACHE_REQUEST_DIGEST_KEY):
+                delattr(request, CACHE_REQUEST_DIGEST_KEY)
+            CacheItem("Benchmark", 60, request, False).cache_key
+
+        return func
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management import BaseCommand
+
+from core.sql_profiler import sql_profiler
+
+
+class Command(BaseCommand):
+    """
+    Show Statements Profiled from Sampled Requests
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sort", type=str, default="time", choices=["time", "count", "avg", "per_request", "slow"])
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--explain", action="store_true", help="print plans of slow statements")
+        parser.add_argument("--reset", action="store_true", help="clear profiled statements")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            sql_profiler.reset()
+            self.stdout.write("reset")
+            return
+
+        rows = []
+        for stat in sql_profiler.load():
+            count = stat.get("count", 0)
+            rows.append(
+                {
+                    **stat,
+                    "count": count,
+                    "time": stat.get("time", 0),
+                    "avg": stat.get("time", 0) / count if count else 0,
+                    # repeated in one request usually means n+1
+                    "per_request": count / stat["requests"] if stat.get("requests") else 0,
+                    "slow": stat.get("slow", 0),
+                }
+            )
+        rows.sort(key=lambda row: row[options["sort"]], reverse=True)
+        self.stdout.write(
+            "{:<10}{:>10}{:>12}{:>10}{:>10}{:>8}  {}".format(
+                "digest", "count", "time(ms)", "avg(ms)", "per req", "slow", "statement"
+            )
+        )
+        for row in rows[: options["limit"]]:
+            self.stdout.write(
+                "{digest:<10.8}{count:>10}{time:>12.1f}{avg:>10.2f}{per_request:>10.1f}{slow:>8}  {statement}".format(
+                    **row
+                )
+            )
+            if options["explain"] and row.get("explain"):
+                for step in row["explain"]:
+                    self.stdout.write(f"{'':<10}{json.dumps(step, ensure_ascii=False)}")
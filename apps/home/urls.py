@@ -1,9 +1,10 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from apps.home.views import HomeView, I18nViewSet
+from apps.home.views import HomeView, I18nViewSet, MetricsView
 
 router = DefaultRouter()
 router.register("", HomeView)
 router.register("i18n", I18nViewSet, basename="i18n")
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [path("metrics", MetricsView.as_view())]
@@ -1,11 +1,15 @@
 from django.conf import settings
 from django.conf.global_settings import LANGUAGE_COOKIE_NAME
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views import View
 from rest_framework.response import Response
 
 from apps.account.models import User
 from apps.home.serializers import I18nRequestSerializer
 from core.auth import SessionAuthenticate
+from core.metrics import metrics_recorder
 from core.viewsets import MainViewSet
 
 USER_MODEL: User = get_user_model()
@@ -51,3 +55,20 @@ class I18nViewSet(MainViewSet):
             domain=settings.SESSION_COOKIE_DOMAIN,
         )
         return response
+
+
+class MetricsView(View):
+    """
+    Metrics in Prometheus Text Format
+    """
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def get(self, request, *args, **kwargs):
+        # disabled without token
+        if not settings.METRICS_TOKEN:
+            return HttpResponse(status=404)
+        # verify token
+        if not constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponse(status=401)
+        return HttpResponse(metrics_recorder.render(), content_type=self.content_type)
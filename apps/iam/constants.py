@@ -2,8 +2,30 @@ from django.utils.translation import gettext_lazy
 
 from core.models import TextChoices
 
+# Bulk
+PERMISSION_BULK_BATCH_SIZE = 1000
+
 
 class PermissionStatusChoices(TextChoices):
     DENIED = "denied", gettext_lazy("denied")
     ALLOWED = "allowed", gettext_lazy("allowed")
     DEALING = "dealing", gettext_lazy("dealing")
+
+
+class PermissionChangeOpChoices(TextChoices):
+    ALLOW = "allow", gettext_lazy("allow")
+    UPDATE = "update", gettext_lazy("update")
+
+
+class PermissionCacheKey:
+    """
+    Permission Cache Key
+    """
+
+    INDEX_VERSION = "iam-permission-index-version"
+    INDEX_MAX_SIZE = 100000
+    SNAPSHOT = "iam-snapshot:v2:{username}"
+    SNAPSHOT_READY = "iam-snapshot-ready:v2"
+    SNAPSHOT_VERSION_FIELD = "_version"
+    SNAPSHOT_REBUILD_RETRIES = 3
+    INSTANCE_MAX_SIZE = 100000
@@ -0,0 +1,211 @@
+import json
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from rest_framework.test import APIClient
+
+from apps.application.models import Application
+from apps.iam.constants import PermissionStatusChoices
+from apps.iam.models import (
+    Action,
+    Instance,
+    InstanceSequence,
+    UserPermission,
+    UserPermissionSnapshot,
+)
+from core.benchmark import benchmark_environment, format_results, run_benchmark
+from core.bitmap import Bitmap
+from core.constants import APP_AUTH_HEADER_KEY, APP_AUTH_ID_KEY, APP_AUTH_SECRET_KEY
+from core.utils import get_auth_token
+
+USER_MODEL = get_user_model()
+
+BENCHMARK_PREFIX = "bench"
+BENCHMARK_RESOURCE = "resource"
+BENCHMARK_SECRET = "benchmark"
+
+
+class Command(BaseCommand):
+    """
+    Benchmark Permission Check, Auth and List in a Temporary Database with Synthetic Data
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--applications", type=int, default=2)
+        parser.add_argument("--actions", type=int, default=20)
+        parser.add_argument("--instances", type=int, default=10000)
+        parser.add_argument("--grants", type=int, default=10000)
+        parser.add_argument("--grant-instances", type=int, default=100)
+        parser.add_argument("--check-actions", type=int, default=5)
+        parser.add_argument("--check-instances", type=int, default=10)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--use-redis", action="store_true")
+        parser.add_argument("--output", type=str, default="")
+
+    def handle(self, *args, **options):
+        self.options = options
+        with benchmark_environment(use_redis=options["use_redis"]):
+            self.random = random.Random(options["seed"])
+            self.seed_data(options)
+            results = [
+                run_benchmark("check", self.call_check, options["iterations"]),
+                run_benchmark("list", self.call_list, options["iterations"]),
+                run_benchmark("auth", self.call_auth, options["iterations"]),
+            ]
+        self.stdout.write(format_results(results))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump({"options": options, "results": [r._asdict() for r in results]}, file, indent=2)
+
+    def seed_data(self, options: dict) -> None:
+        """
+        seed users, applications, actions, instances and grants with bulk insert
+        """
+
+        # users
+        users = [
+            USER_MODEL(username=f"{BENCHMARK_PREFIX}-u{index}", nick_name=f"{BENCHMARK_PREFIX}-u{index}")
+            for index in range(options["users"])
+        ]
+        for user in users:
+            user.set_unusable_password()
+        USER_MODEL.objects.bulk_create(users, batch_size=1000)
+        self.usernames = [user.username for user in users]
+
+        # applications
+        applications = [
+            Application.objects.create(
+                app_name=f"{BENCHMARK_PREFIX}-app{index}",
+                app_code=f"{BENCHMARK_PREFIX}-app{index}",
+                app_secret=BENCHMARK_SECRET,
+                managers=users[:1],
+            )
+            for index in range(options["applications"])
+        ]
+        self.application = applications[0]
+
+        # actions
+        actions = [
+            Action(
+                application=application,
+                action_id=f"action{index}",
+                action_name=f"action{index}",
+                resource_id=BENCHMARK_RESOURCE,
+            )
+            for application in applications
+            for index in range(options["actions"])
+        ]
+        Action.objects.bulk_create(actions, batch_size=1000)
+        self.action_ids = [action.id for action in actions if action.application_id == self.application.app_code]
+
+        # instances, serial starts from 1
+        instances = [
+            Instance(
+                application=application,
+                resource_id=BENCHMARK_RESOURCE,
+                instance_id=f"instance{index}",
+                instance_name=f"instance{index}",
+                serial=index + 1,
+            )
+            for application in applications
+            for index in range(options["instances"])
+        ]
+        Instance.objects.bulk_create(instances, batch_size=1000)
+        InstanceSequence.objects.bulk_create(
+            [
+                InstanceSequence(
+                    application=application, resource_id=BENCHMARK_RESOURCE, last_serial=options["instances"]
+                )
+                for application in applications
+            ]
+        )
+        self.instance_ids = [
+            instance.id for instance in instances if instance.application_id == self.application.app_code
+        ]
+
+        # grants
+        grant_instances = min(options["grant_instances"], options["instances"])
+        keys = {(self.random.choice(users).username, self.random.choice(actions).id) for _ in range(options["grants"])}
+        # listed user is granted all actions of the application, so list serializes a full page
+        self.list_username = self.usernames[0]
+        keys.update((self.list_username, action_id) for action_id in self.action_ids)
+        permissions = [
+            UserPermission(
+                user_id=username,
+                action_id=action_id,
+                bitmap=Bitmap.from_members(self.random.sample(range(1, options["instances"] + 1), grant_instances)),
+                status=PermissionStatusChoices.ALLOWED,
+            )
+            for (username, action_id) in keys
+        ]
+        UserPermission.objects.bulk_create(permissions, batch_size=1000)
+        UserPermissionSnapshot.objects.bulk_create(
+            [
+                UserPermissionSnapshot(
+                    id=p.id,
+                    user_id=p.user_id,
+                    action_id=p.action_id,
+                    instances_bitmap=p.instances_bitmap,
+                    status=p.status,
+                )
+                for p in permissions
+            ],
+            batch_size=1000,
+        )
+
+        # clients
+        self.app_client = APIClient()
+        self.app_client.credentials(
+            **{
+                APP_AUTH_HEADER_KEY: json.dumps(
+                    {APP_AUTH_ID_KEY: self.application.app_code, APP_AUTH_SECRET_KEY: BENCHMARK_SECRET}
+                )
+            }
+        )
+        self.user_client = APIClient()
+        self.user_client.cookies[settings.AUTH_TOKEN_NAME] = get_auth_token(self.list_username)
+
+    def call_check(self, index: int) -> None:
+        permissions = [
+            {"action": action_id, "instances": self.random.sample(self.instance_ids, self.check_instances)}
+            for action_id in self.random.sample(self.action_ids, self.check_actions)
+        ]
+        self.post(
+            self.app_client,
+            "/iam/check/api/",
+            {"username": self.random.choice(self.usernames), "permissions": permissions},
+        )
+
+    def call_list(self, index: int) -> None:
+        self.check_response(self.user_client.get("/iam/user/", {"application_id": self.application.app_code}))
+
+    def call_auth(self, index: int) -> None:
+        self.post(
+            self.app_client,
+            "/iam/manage/auth/",
+            {
+                "user": self.random.choice(self.usernames),
+                "action": self.random.choice(self.action_ids),
+                "instances": self.random.sample(self.instance_ids, self.check_instances),
+                "all_instances": False,
+            },
+        )
+
+    @property
+    def check_actions(self) -> int:
+        return min(self.options["check_actions"], len(self.action_ids))
+
+    @property
+    def check_instances(self) -> int:
+        return min(self.options["check_instances"], len(self.instance_ids))
+
+    def post(self, client: APIClient, path: str, data: dict) -> None:
+        self.check_response(client.post(path, data, format="json"))
+
+    def check_response(self, response) -> None:
+        if response.status_code != 200:
+            raise RuntimeError(f"[Benchmark] {response.request['PATH_INFO']} => {response.content[:200]}")
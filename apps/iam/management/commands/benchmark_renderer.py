@@ -0,0 +1,88 @@
+import datetime
+import decimal
+import json
+import random
+
+from django.core.management import BaseCommand
+from django.test.utils import override_settings
+from django.utils.translation import gettext_lazy
+
+from core.benchmark import format_results, run_benchmark
+from core.renderers import JSON_ENGINES, APIRenderer
+from core.utils import uniq_id_without_time
+
+
+class Command(BaseCommand):
+    """
+    Benchmark APIRenderer with Payload Shaped like UserPermissionListSerializer for each JSON Engine
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--permissions", type=int, default=100)
+        parser.add_argument("--instances", type=int, default=50)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", type=str, default="")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        payloads = {
+            "serialized": self.build_payload(options, False),
+            "raw": self.build_payload(options, True),
+        }
+        results = []
+        sizes = {}
+        for (name, payload) in payloads.items():
+            for engine in JSON_ENGINES:
+                with override_settings(JSON_RENDERER_ENGINE=engine):
+                    sizes[f"{name}-{engine}"] = len(self.render(payload))
+                    results.append(
+                        run_benchmark(f"{name}-{engine}", lambda index: self.render(payload), options["iterations"])
+                    )
+        self.stdout.write(format_results(results))
+        self.stdout.write("\n".join(f"[{name}] Size => {size} bytes" for (name, size) in sizes.items()))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(
+                    {"options": options, "results": [r._asdict() for r in results], "sizes": sizes}, file, indent=2
+                )
+
+    def build_payload(self, options: dict, raw: bool) -> dict:
+        """
+        paginated permission list, raw payload keeps datetime, decimal and lazy string for encoder fallback
+        """
+
+        now = datetime.datetime.now()
+        results = []
+        for index in range(options["permissions"]):
+            update_at = now - datetime.timedelta(seconds=self.random.randint(0, 1 << 20))
+            results.append(
+                {
+                    "id": uniq_id_without_time(),
+                    "action_id": f"action{index}",
+                    "action_name": gettext_lazy("Action Name") if raw else f"动作{index}",
+                    "resource_name": f"资源{index}",
+                    "description": f"description of action{index}",
+                    "instances": [
+                        {
+                            "id": uniq_id_without_time(),
+                            "resource_id": "resource",
+                            "instance_id": f"instance{serial}",
+                            "instance_name": f"实例{serial}",
+                            "serial": serial,
+                            "application": "app",
+                        }
+                        for serial in range(options["instances"])
+                    ],
+                    "all_instances": False,
+                    "status": "allowed",
+                    "weight": decimal.Decimal("1.5") if raw else 1.5,
+                    "update_at": update_at if raw else update_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    "user": f"user{index}",
+                    "action": uniq_id_without_time(),
+                }
+            )
+        return {"total": len(results), "current": 1, "results": results}
+
+    def render(self, payload: dict) -> bytes:
+        return APIRenderer().render(payload, renderer_context={"request": None})
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from apps.iam.utils import snapshot_cache
+
+
+class Command(BaseCommand):
+    """
+    Rebuild UserPermissionSnapshot in Redis from Database
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_count = snapshot_cache.rebuild(options["batch_size"])
+        self.stdout.write(f"[RebuildSnapshotCache] Users => {user_count}")
@@ -0,0 +1,156 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:56
+
+import zlib
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import core.models
+import core.utils
+
+
+def encode_instances(apps, schema_editor):
+    Instance = apps.get_model("iam", "Instance")
+    InstanceSequence = apps.get_model("iam", "InstanceSequence")
+    UserPermission = apps.get_model("iam", "UserPermission")
+    UserPermissionSnapshot = apps.get_model("iam", "UserPermissionSnapshot")
+
+    # assign serial in each application and resource
+    serial_map = {}
+    last_serials = defaultdict(int)
+    for instance in Instance.objects.order_by("application_id", "resource_id", "instance_id"):
+        namespace = (instance.application_id, instance.resource_id)
+        last_serials[namespace] += 1
+        instance.serial = last_serials[namespace]
+        serial_map[(*namespace, instance.id)] = instance.serial
+        instance.save(update_fields=["serial"])
+    InstanceSequence.objects.bulk_create(
+        [
+            InstanceSequence(application_id=application_id, resource_id=resource_id, last_serial=last_serial)
+            for ((application_id, resource_id), last_serial) in last_serials.items()
+        ]
+    )
+
+    # encode instance ids to bitmap
+    for model in [UserPermission, UserPermissionSnapshot]:
+        to_update = []
+        for permission in model.objects.select_related("action"):
+            namespace = (permission.action.application_id, permission.action.resource_id)
+            value = 0
+            for instance_id in permission.instances or []:
+                serial = serial_map.get((*namespace, instance_id))
+                if serial is not None:
+                    value |= 1 << serial
+            permission.instances_bitmap = zlib.compress(value.to_bytes((value.bit_length() + 7) // 8, "little"))
+            to_update.append(permission)
+        model.objects.bulk_update(to_update, fields=["instances_bitmap"], batch_size=1000)
+
+
+def decode_instances(apps, schema_editor):
+    Instance = apps.get_model("iam", "Instance")
+    UserPermission = apps.get_model("iam", "UserPermission")
+    UserPermissionSnapshot = apps.get_model("iam", "UserPermissionSnapshot")
+
+    # map serial back to instance id in each application and resource
+    instance_map = {
+        (application_id, resource_id, serial): instance_id
+        for (application_id, resource_id, serial, instance_id) in Instance.objects.filter(
+            serial__isnull=False
+        ).values_list("application_id", "resource_id", "serial", "id")
+    }
+
+    # decode bitmap to instance ids
+    for model in [UserPermission, UserPermissionSnapshot]:
+        to_update = []
+        for permission in model.objects.select_related("action"):
+            namespace = (permission.action.application_id, permission.action.resource_id)
+            data = permission.instances_bitmap
+            value = int.from_bytes(zlib.decompress(bytes(data)), "little") if data else 0
+            permission.instances = [
+                instance_map[(*namespace, serial)]
+                for serial in range(value.bit_length())
+                if value >> serial & 1 and (*namespace, serial) in instance_map
+            ]
+            to_update.append(permission)
+        model.objects.bulk_update(to_update, fields=["instances"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("application", "0002_application_app_logo_application_app_url"),
+        ("iam", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="instance",
+            name="serial",
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name="Serial"),
+        ),
+        migrations.AddField(
+            model_name="userpermission",
+            name="instances_bitmap",
+            field=models.BinaryField(blank=True, null=True, verbose_name="Instances"),
+        ),
+        migrations.AddField(
+            model_name="userpermissionsnapshot",
+            name="instances_bitmap",
+            field=models.BinaryField(blank=True, null=True, verbose_name="Instances"),
+        ),
+        migrations.CreateModel(
+            name="InstanceSequence",
+            fields=[
+                (
+                    "id",
+                    core.models.UniqIDField(
+                        default=core.utils.uniq_id_without_time,
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resource_id",
+                    models.CharField(blank=True, max_length=32, null=True, verbose_name="Resource ID"),
+                ),
+                (
+                    "last_serial",
+                    models.PositiveIntegerField(default=0, verbose_name="Last Serial"),
+                ),
+                (
+                    "application",
+                    core.models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="application.application",
+                        verbose_name="Application",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Instance Sequence",
+                "verbose_name_plural": "Instance Sequence",
+                "ordering": ["id"],
+                "unique_together": {("application", "resource_id")},
+            },
+        ),
+        migrations.RunPython(encode_instances, decode_instances),
+        migrations.RemoveField(
+            model_name="userpermission",
+            name="instances",
+        ),
+        migrations.RemoveField(
+            model_name="userpermissionsnapshot",
+            name="instances",
+        ),
+        migrations.AlterUniqueTogether(
+            name="instance",
+            unique_together={
+                ("application", "resource_id", "serial"),
+                ("application", "resource_id", "instance_id"),
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import core.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("application", "0002_application_app_logo_application_app_url"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("iam", "0002_instance_serial_bitmap"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PermissionChange",
+            fields=[
+                (
+                    "seq",
+                    models.BigAutoField(primary_key=True, serialize=False, verbose_name="Sequence"),
+                ),
+                (
+                    "op",
+                    models.CharField(
+                        choices=[
+                            ("allow", "allow"),
+                            ("update", "update"),
+                            ("deny", "deny"),
+                        ],
+                        max_length=32,
+                        verbose_name="Operation",
+                    ),
+                ),
+                (
+                    "instances_bitmap",
+                    models.BinaryField(blank=True, null=True, verbose_name="Instances"),
+                ),
+                (
+                    "removed_bitmap",
+                    models.BinaryField(blank=True, null=True, verbose_name="Removed Instances"),
+                ),
+                (
+                    "all_instances",
+                    models.BooleanField(default=False, verbose_name="All Instances"),
+                ),
+                (
+                    "create_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Create At"),
+                ),
+                (
+                    "action",
+                    core.models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="iam.action",
+                        verbose_name="Action",
+                    ),
+                ),
+                (
+                    "application",
+                    core.models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="application.application",
+                        verbose_name="Application",
+                    ),
+                ),
+                (
+                    "user",
+                    core.models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Permission Change",
+                "verbose_name_plural": "Permission Change",
+                "ordering": ["seq"],
+                "index_together": {("application", "seq")},
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Max
+
+import core.models
+import core.utils
+
+
+def assign_cursors(apps, schema_editor):
+    PermissionChange = apps.get_model("iam", "PermissionChange")
+    PermissionChangeSequence = apps.get_model("iam", "PermissionChangeSequence")
+
+    # cursor of recorded changes is the same as seq, so feed consumers can continue from their last seq
+    PermissionChange.objects.update(cursor=F("seq"))
+    PermissionChangeSequence.objects.bulk_create(
+        [
+            PermissionChangeSequence(application_id=application_id, last_cursor=last_cursor)
+            for (application_id, last_cursor) in PermissionChange.objects.values("application_id")
+            .annotate(last_cursor=Max("seq"))
+            .values_list("application_id", "last_cursor")
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("application", "0002_application_app_logo_application_app_url"),
+        ("iam", "0003_permission_change"),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name="permissionchange",
+            index_together=set(),
+        ),
+        migrations.AddField(
+            model_name="permissionchange",
+            name="cursor",
+            field=models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name="Cursor"),
+        ),
+        migrations.AlterField(
+            model_name="permissionchange",
+            name="op",
+            field=models.CharField(
+                choices=[("allow", "allow"), ("update", "update")],
+                max_length=32,
+                verbose_name="Operation",
+            ),
+        ),
+        migrations.AlterIndexTogether(
+            name="permissionchange",
+            index_together={("application", "cursor")},
+        ),
+        migrations.CreateModel(
+            name="PermissionChangeSequence",
+            fields=[
+                (
+                    "id",
+                    core.models.UniqIDField(
+                        default=core.utils.uniq_id_without_time,
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_cursor",
+                    models.BigIntegerField(default=0, verbose_name="Last Cursor"),
+                ),
+                (
+                    "application",
+                    core.models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="application.application",
+                        verbose_name="Application",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Permission Change Sequence",
+                "verbose_name_plural": "Permission Change Sequence",
+                "ordering": ["id"],
+                "unique_together": {("application",)},
+            },
+        ),
+        migrations.RunPython(assign_cursors, migrations.RunPython.noop),
+    ]
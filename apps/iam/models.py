@@ -1,7 +1,15 @@
-from django.db import models
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.utils.translation import gettext_lazy
 
-from apps.iam.constants import PermissionStatusChoices
+from apps.iam.constants import (
+    PERMISSION_BULK_BATCH_SIZE,
+    PermissionChangeOpChoices,
+    PermissionStatusChoices,
+)
+from core.bitmap import Bitmap
 from core.constants import SHORT_CHAR_LENGTH
 from core.models import BaseModel, ForeignKey, UniqIDField
 
@@ -36,12 +44,65 @@ class Instance(BaseModel):
     resource_id = models.CharField(gettext_lazy("Resource ID"), max_length=SHORT_CHAR_LENGTH, null=True, blank=True)
     instance_id = models.CharField(gettext_lazy("Instance ID"), max_length=SHORT_CHAR_LENGTH)
     instance_name = models.CharField(gettext_lazy("Instance Name"), max_length=SHORT_CHAR_LENGTH)
+    serial = models.PositiveIntegerField(gettext_lazy("Serial"), null=True, blank=True)
 
     class Meta:
         verbose_name = gettext_lazy("Resource")
         verbose_name_plural = verbose_name
         ordering = ["id"]
-        unique_together = [["application", "resource_id", "instance_id"]]
+        unique_together = [["application", "resource_id", "instance_id"], ["application", "resource_id", "serial"]]
+
+    def save(self, *args, **kwargs) -> None:
+        if self.serial is None:
+            self.serial = InstanceSequence.next_serial(self.application_id, self.resource_id)
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def load_by_permissions(cls, permissions: Iterable["UserPermissionBase"]) -> Dict[Tuple[str, str, int], "Instance"]:
+        """
+        load instances of permissions in one query, key is (application_id, resource_id, serial)
+        """
+
+        namespace_serials = {}
+        for p in permissions:
+            namespace_serials.setdefault(p.instance_namespace, set()).update(p.bitmap)
+        namespace_filter = Q()
+        for ((application_id, resource_id), serials) in namespace_serials.items():
+            if serials:
+                namespace_filter |= Q(application_id=application_id, resource_id=resource_id, serial__in=serials)
+        if not namespace_filter:
+            return {}
+        instances = cls.objects.filter(namespace_filter)
+        return {(i.application_id, i.resource_id, i.serial): i for i in instances}
+
+
+class InstanceSequence(BaseModel):
+    """
+    Instance Serial Sequence
+    serial of instance is dense and never reused in the same application and resource
+    """
+
+    id = UniqIDField(gettext_lazy("ID"))
+    application = ForeignKey(gettext_lazy("Application"), to="application.Application", on_delete=models.CASCADE)
+    resource_id = models.CharField(gettext_lazy("Resource ID"), max_length=SHORT_CHAR_LENGTH, null=True, blank=True)
+    last_serial = models.PositiveIntegerField(gettext_lazy("Last Serial"), default=0)
+
+    class Meta:
+        verbose_name = gettext_lazy("Instance Sequence")
+        verbose_name_plural = verbose_name
+        ordering = ["id"]
+        unique_together = [["application", "resource_id"]]
+
+    @classmethod
+    def next_serial(cls, application_id: str, resource_id: str) -> int:
+        """
+        get next serial, the row is locked until current transaction finished
+        """
+
+        with transaction.atomic():
+            sequence, _ = cls.objects.get_or_create(application_id=application_id, resource_id=resource_id)
+            cls.objects.filter(pk=sequence.pk).update(last_serial=F("last_serial") + 1)
+            return cls.objects.values_list("last_serial", flat=True).get(pk=sequence.pk)
 
 
 class UserPermissionBase(BaseModel):
@@ -52,7 +113,7 @@ class UserPermissionBase(BaseModel):
     id = UniqIDField(gettext_lazy("ID"))
     user = ForeignKey(gettext_lazy("User"), to="account.User", on_delete=models.CASCADE)
     action = ForeignKey(gettext_lazy("Action"), to="iam.Action", on_delete=models.CASCADE)
-    instances = models.JSONField(gettext_lazy("Instances"), default=list, null=True)
+    instances_bitmap = models.BinaryField(gettext_lazy("Instances"), null=True, blank=True)
     all_instances = models.BooleanField(gettext_lazy("All Instances"), default=False)
     status = models.CharField(
         gettext_lazy("Status"),
@@ -66,6 +127,56 @@ class UserPermissionBase(BaseModel):
     class Meta:
         abstract = True
 
+    @property
+    def bitmap(self) -> Bitmap:
+        """
+        serials of instances
+        """
+
+        return Bitmap.loads(self.instances_bitmap)
+
+    @bitmap.setter
+    def bitmap(self, bitmap: Bitmap) -> None:
+        self.instances_bitmap = bitmap.dumps()
+
+    @property
+    def instance_namespace(self) -> Tuple[str, str]:
+        """
+        serials of instances are unique in (application_id, resource_id) of action
+        """
+
+        return self.action.application_id, self.action.resource_id
+
+    def get_instance_ids(self) -> List[str]:
+        """
+        ids of instances, loaded in one query
+        """
+
+        return [instance.id for instance in self.get_instances()]
+
+    def set_instance_ids(self, instance_ids: List[str]) -> None:
+        """
+        replace instances by ids, serials are loaded in one query
+        """
+
+        application_id, resource_id = self.instance_namespace
+        self.bitmap = Bitmap.from_members(
+            Instance.objects.filter(
+                pk__in=instance_ids or [], application_id=application_id, resource_id=resource_id
+            ).values_list("serial", flat=True)
+        )
+
+    def get_instances(self, instance_map: Dict[Tuple[str, str, int], Instance] = None) -> List[Instance]:
+        """
+        instances of permission, instance_map can be loaded by Instance.load_by_permissions for multiple permissions
+        """
+
+        if instance_map is None:
+            instance_map = Instance.load_by_permissions([self])
+        application_id, resource_id = self.instance_namespace
+        keys = [(application_id, resource_id, serial) for serial in self.bitmap]
+        return [instance_map[key] for key in keys if key in instance_map]
+
 
 class UserPermission(UserPermissionBase):
     """
@@ -91,3 +202,82 @@ class UserPermissionSnapshot(UserPermissionBase):
         ordering = ["action", "-update_at"]
         index_together = [["user", "action", "status"]]
         unique_together = [["user", "action"]]
+
+
+class PermissionChangeSequence(BaseModel):
+    """
+    Permission Change Cursor Sequence
+    cursor is allocated after change committed, so changes become visible in order of cursor
+    """
+
+    id = UniqIDField(gettext_lazy("ID"))
+    application = ForeignKey(gettext_lazy("Application"), to="application.Application", on_delete=models.CASCADE)
+    last_cursor = models.BigIntegerField(gettext_lazy("Last Cursor"), default=0)
+
+    class Meta:
+        verbose_name = gettext_lazy("Permission Change Sequence")
+        verbose_name_plural = verbose_name
+        ordering = ["id"]
+        unique_together = [["application"]]
+
+    @classmethod
+    def assign_cursors(cls, application_id: str) -> int:
+        """
+        assign cursors to committed changes without cursor in order of seq, return count of changes
+        the row is locked until assigned cursors committed, so a cursor is never visible before smaller ones
+        """
+
+        with transaction.atomic():
+            sequence, _ = cls.objects.select_for_update().get_or_create(application_id=application_id)
+            changes = list(
+                PermissionChange.objects.filter(application_id=application_id, cursor__isnull=True)
+                .only("seq")
+                .order_by("seq")
+            )
+            for (cursor, change) in enumerate(changes, start=sequence.last_cursor + 1):
+                change.cursor = cursor
+            PermissionChange.objects.bulk_update(changes, fields=["cursor"], batch_size=PERMISSION_BULK_BATCH_SIZE)
+            cls.objects.filter(pk=sequence.pk).update(last_cursor=sequence.last_cursor + len(changes))
+            return len(changes)
+
+
+class PermissionChange(BaseModel):
+    """
+    Permission Change Feed
+    append only, instances_bitmap is all instances for allow and added instances for update
+    seq is allocated on insert but visible on commit, so the feed is served in order of cursor
+    """
+
+    seq = models.BigAutoField(gettext_lazy("Sequence"), primary_key=True)
+    cursor = models.BigIntegerField(gettext_lazy("Cursor"), null=True, blank=True, db_index=True)
+    application = ForeignKey(gettext_lazy("Application"), to="application.Application", on_delete=models.CASCADE)
+    user = ForeignKey(gettext_lazy("User"), to="account.User", on_delete=models.CASCADE)
+    action = ForeignKey(gettext_lazy("Action"), to="iam.Action", on_delete=models.CASCADE)
+    op = models.CharField(
+        gettext_lazy("Operation"), max_length=SHORT_CHAR_LENGTH, choices=PermissionChangeOpChoices.choices
+    )
+    instances_bitmap = models.BinaryField(gettext_lazy("Instances"), null=True, blank=True)
+    removed_bitmap = models.BinaryField(gettext_lazy("Removed Instances"), null=True, blank=True)
+    all_instances = models.BooleanField(gettext_lazy("All Instances"), default=False)
+    create_at = models.DateTimeField(gettext_lazy("Create At"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = gettext_lazy("Permission Change")
+        verbose_name_plural = verbose_name
+        ordering = ["seq"]
+        index_together = [["application", "cursor"]]
+
+    def __str__(self) -> str:
+        return str(self.seq)
+
+    @property
+    def instance_namespace(self) -> Tuple[str, str]:
+        return self.action.application_id, self.action.resource_id
+
+    @property
+    def bitmap(self) -> Bitmap:
+        """
+        serials of all instances in change, used for loading instances
+        """
+
+        return Bitmap.loads(self.instances_bitmap) | Bitmap.loads(self.removed_bitmap)
@@ -4,7 +4,7 @@ from django.utils.translation import gettext
 from rest_framework.permissions import BasePermission
 
 from apps.application.models import ApplicationManager
-from apps.iam.models import Action, UserPermission
+from apps.iam.models import UserPermission
 from core.constants import ViewActionChoices
 from core.exceptions import PermissionDenied
 
@@ -16,7 +16,7 @@ class ManagerPermissionBase(BasePermission):
 
     def has_permission(self, request, view):
         application = self._get_application_id(request)
-        if ApplicationManager.objects.filter(application_id=application, manager=request.user).exists():
+        if ApplicationManager.objects.is_manager(application, request.user.username):
             return True
         raise PermissionDenied(gettext("Application Manager Permission Required"))
 
@@ -32,7 +32,7 @@ class ManageObjPermissionBase(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         application = self._get_application_id(obj)
-        if ApplicationManager.objects.filter(application_id=application, manager=request.user).exists():
+        if ApplicationManager.objects.is_manager(application, request.user.username):
             return True
         raise PermissionDenied(gettext("Application Manager Permission Required"))
 
@@ -56,7 +56,7 @@ class IAMUpdatePermission(ManageObjPermissionBase):
     """
 
     def _get_application_id(self, obj):
-        return obj.application.app_code
+        return obj.application_id
 
 
 class IAMActionObjAppPermission(BasePermission):
@@ -76,7 +76,7 @@ class UserPermissionSelf(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        if obj.user == request.user:
+        if obj.user_id == request.user.pk:
             return True
         raise PermissionDenied(gettext("You are not allowed to update this permission"))
 
@@ -89,13 +89,16 @@ class ManagePermissionPermission(BasePermission):
     def has_permission(self, request, view):
         if view.action in [ViewActionChoices.LIST]:
             application_id = request.query_params.get("application_id")
-            if ApplicationManager.objects.filter(application_id=application_id, manager=request.user).exists():
+            if ApplicationManager.objects.is_manager(application_id, request.user.username):
                 return True
             raise PermissionDenied(gettext("Application Manager Permission Required"))
         if view.action in [ViewActionChoices.CREATE]:
-            managed_apps = ApplicationManager.objects.filter(manager=request.user).values_list("application")
-            actions = Action.objects.filter(application__in=managed_apps)
-            if UserPermission.objects.filter(id=request.data.get("permission_id"), action__in=actions).exists():
+            application_id = (
+                UserPermission.objects.filter(id=request.data.get("permission_id"))
+                .values_list("action__application_id", flat=True)
+                .first()
+            )
+            if application_id and ApplicationManager.objects.is_manager(application_id, request.user.username):
                 return True
             raise PermissionDenied(gettext("Application Manager Permission Required"))
         raise PermissionDenied()
@@ -5,6 +5,10 @@ from apps.iam.serializers.action import (
     ActionListRequestSerializer,
     ActionUpdateSerializer,
 )
+from apps.iam.serializers.change import (
+    PermissionChangeListRequestSerializer,
+    PermissionChangeSerializer,
+)
 from apps.iam.serializers.instance import (
     InstanceAllSerializer,
     InstanceCreateSerializer,
@@ -15,7 +19,10 @@ from apps.iam.serializers.instance import (
 from apps.iam.serializers.user import (
     ApplyPermissionSerializer,
     AuthPermissionSerializer,
+    BulkAuthPermissionSerializer,
+    BulkCheckPermissionSerializer,
     CheckPermissionSerializer,
+    DeltaPermissionSerializer,
     ManagePermissionApplySerializer,
     ManagePermissionSerializer,
     PermissionItemSerializer,
@@ -41,9 +48,14 @@ __all__ = [
     "ApplyPermissionSerializer",
     "UpdatePermissionSerializer",
     "CheckPermissionSerializer",
+    "BulkCheckPermissionSerializer",
     "ManagePermissionSerializer",
     "ManagePermissionApplySerializer",
     "AuthPermissionSerializer",
+    "DeltaPermissionSerializer",
+    "BulkAuthPermissionSerializer",
     "PermissionItemSerializer",
     "InstanceAllSerializer",
+    "PermissionChangeListRequestSerializer",
+    "PermissionChangeSerializer",
 ]
@@ -0,0 +1,43 @@
+from typing import List
+
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+
+from apps.iam.models import PermissionChange
+from core.bitmap import Bitmap
+from core.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+class PermissionChangeListRequestSerializer(serializers.Serializer):
+    """
+    Permission Change List Request
+    """
+
+    since = serializers.IntegerField(label=gettext_lazy("Since Cursor"), min_value=0, default=0)
+    size = serializers.IntegerField(
+        label=gettext_lazy("Page Size"), min_value=1, max_value=MAX_PAGE_SIZE, default=DEFAULT_PAGE_SIZE
+    )
+
+
+class PermissionChangeSerializer(serializers.ModelSerializer):
+    """
+    Permission Change
+    """
+
+    instances = serializers.SerializerMethodField(label=gettext_lazy("Instances"))
+    removed_instances = serializers.SerializerMethodField(label=gettext_lazy("Removed Instances"))
+
+    class Meta:
+        model = PermissionChange
+        exclude = ["application", "instances_bitmap", "removed_bitmap"]
+
+    def get_instances(self, obj: PermissionChange) -> List[str]:
+        return self._get_instance_ids(obj, obj.instances_bitmap)
+
+    def get_removed_instances(self, obj: PermissionChange) -> List[str]:
+        return self._get_instance_ids(obj, obj.removed_bitmap)
+
+    def _get_instance_ids(self, obj: PermissionChange, instances_bitmap: bytes) -> List[str]:
+        application_id, resource_id = obj.instance_namespace
+        keys = [(application_id, resource_id, serial) for serial in Bitmap.loads(instances_bitmap)]
+        return [self.context[key].id for key in keys if key in self.context]
@@ -12,6 +12,7 @@ class InstanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Instance
         fields = "__all__"
+        read_only_fields = ["serial"]
 
 
 class InstanceAllSerializer(serializers.ModelSerializer):
@@ -40,6 +41,7 @@ class InstanceCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Instance
         fields = "__all__"
+        read_only_fields = ["serial"]
 
 
 class InstanceUpdateSerializer(serializers.ModelSerializer):
@@ -10,6 +10,7 @@ from apps.iam.constants import PermissionStatusChoices
 from apps.iam.exceptions import ActionDoesNotExist
 from apps.iam.models import Action, Instance, UserPermission
 from apps.iam.serializers import InstanceSerializer
+from core.bitmap import Bitmap
 
 USER_MODEL: User = get_user_model()
 
@@ -19,9 +20,16 @@ class UserPermissionSerializer(serializers.ModelSerializer):
     User Permission
     """
 
+    instances = serializers.ListField(
+        label=gettext_lazy("Instances"),
+        child=serializers.CharField(label=gettext_lazy("Instance ID")),
+        source="get_instance_ids",
+        read_only=True,
+    )
+
     class Meta:
         model = UserPermission
-        fields = "__all__"
+        exclude = ["instances_bitmap"]
 
 
 class UserPermissionListRequestSerializer(serializers.Serializer):
@@ -46,7 +54,7 @@ class UserPermissionListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = UserPermission
-        fields = "__all__"
+        exclude = ["instances_bitmap"]
 
     def get_action_id(self, obj: UserPermission) -> str:
         return obj.action.action_id
@@ -65,16 +73,7 @@ class UserPermissionListSerializer(serializers.ModelSerializer):
         if obj.all_instances:
             return []
         # instance list
-        instances = []
-        instance_ids = obj.instances
-        if not instance_ids:
-            return []
-        for pk in instance_ids:
-            instance = self.context.get(pk)
-            if not instance:
-                continue
-            instances.append(InstanceSerializer(instance).data)
-        return instances
+        return InstanceSerializer(obj.get_instances(self.context), many=True).data
 
 
 class ApplyPermissionSerializer(serializers.ModelSerializer):
@@ -82,18 +81,22 @@ class ApplyPermissionSerializer(serializers.ModelSerializer):
     Apply Permission
     """
 
+    instances = serializers.ListField(
+        label=gettext_lazy("Instances"), child=serializers.CharField(label=gettext_lazy("Instance ID")), default=list
+    )
+
     class Meta:
         model = UserPermission
-        fields = "__all__"
+        exclude = ["instances_bitmap"]
 
     def validate(self, attrs: dict) -> dict:
         attrs = super().validate(attrs)
-        attrs["instances"] = list(
+        attrs["bitmap"] = Bitmap.from_members(
             Instance.objects.filter(
-                pk__in=attrs["instances"],
-                application=attrs["action"].application,
+                pk__in=attrs.pop("instances"),
+                application_id=attrs["action"].application_id,
                 resource_id=attrs["action"].resource_id,
-            ).values_list("id", flat=True)
+            ).values_list("serial", flat=True)
         )
         return attrs
 
@@ -103,19 +106,23 @@ class UpdatePermissionSerializer(serializers.ModelSerializer):
     Update Permission
     """
 
+    instances = serializers.ListField(
+        label=gettext_lazy("Instances"), child=serializers.CharField(label=gettext_lazy("Instance ID")), required=False
+    )
+
     class Meta:
         model = UserPermission
         fields = ["instances", "all_instances", "status"]
 
     def validate(self, attrs: dict) -> dict:
         attrs = super().validate(attrs)
-        if attrs.get("instances"):
-            attrs["instances"] = list(
+        if "instances" in attrs:
+            attrs["bitmap"] = Bitmap.from_members(
                 Instance.objects.filter(
-                    pk__in=attrs["instances"],
-                    application=self.instance.action.application,
+                    pk__in=attrs.pop("instances"),
+                    application_id=self.instance.action.application_id,
                     resource_id=self.instance.action.resource_id,
-                ).values_list("id", flat=True)
+                ).values_list("serial", flat=True)
             )
         return attrs
 
@@ -140,6 +147,23 @@ class CheckPermissionSerializer(serializers.Serializer):
     permissions = PermissionItemSerializer(label=gettext_lazy("Permissions"), many=True)
 
 
+class UserPermissionItemSerializer(serializers.Serializer):
+    """
+    User Permission Item
+    """
+
+    username = serializers.CharField(label=gettext_lazy("Username"))
+    permissions = PermissionItemSerializer(label=gettext_lazy("Permissions"), many=True)
+
+
+class BulkCheckPermissionSerializer(serializers.Serializer):
+    """
+    Bulk Check Permission
+    """
+
+    users = UserPermissionItemSerializer(label=gettext_lazy("Users"), many=True)
+
+
 class ManagePermissionSerializer(serializers.Serializer):
     """
     Manage Permission
@@ -157,28 +181,20 @@ class ManagePermissionApplySerializer(serializers.Serializer):
     status = serializers.ChoiceField(label=gettext_lazy("Permission Status"), choices=PermissionStatusChoices.choices)
 
 
-class AuthPermissionSerializer(serializers.Serializer):
+class AuthPermissionBaseSerializer(serializers.Serializer):
     """
-    Auth Permission
+    Auth Permission Base
     """
 
     user = serializers.CharField(label=gettext_lazy("User"))
     action = serializers.CharField(label=gettext_lazy("Action"))
-    instances = serializers.ListField(
-        label=gettext_lazy("Instances"), child=serializers.CharField(label=gettext_lazy("Instance ID"))
-    )
-    all_instances = serializers.BooleanField(label=gettext_lazy("All Instances"))
 
-    def validate(self, attrs: dict) -> dict:
-        data = super().validate(attrs)
-        data["instances"] = list(
+    def load_bitmap(self, action: Action, instance_ids: List[str]) -> Bitmap:
+        return Bitmap.from_members(
             Instance.objects.filter(
-                application=attrs["action"].application,
-                resource_id=attrs["action"].resource_id,
-                id__in=data["instances"],
-            ).values_list("id", flat=True)
+                application=action.application, resource_id=action.resource_id, id__in=instance_ids
+            ).values_list("serial", flat=True)
         )
-        return data
 
     def validate_user(self, user: str) -> USER_MODEL:
         try:
@@ -191,3 +207,107 @@ class AuthPermissionSerializer(serializers.Serializer):
             return Action.objects.get(id=action, application=self.context["application"])
         except Action.DoesNotExist:
             raise serializers.ValidationError(str(ActionDoesNotExist.default_detail))
+
+
+class AuthPermissionSerializer(AuthPermissionBaseSerializer):
+    """
+    Auth Permission
+    """
+
+    instances = serializers.ListField(
+        label=gettext_lazy("Instances"), child=serializers.CharField(label=gettext_lazy("Instance ID"))
+    )
+    all_instances = serializers.BooleanField(label=gettext_lazy("All Instances"))
+
+    def validate(self, attrs: dict) -> dict:
+        data = super().validate(attrs)
+        data["bitmap"] = self.load_bitmap(data["action"], data["instances"])
+        return data
+
+
+class DeltaPermissionSerializer(AuthPermissionBaseSerializer):
+    """
+    Delta Permission
+    """
+
+    add_instances = serializers.ListField(
+        label=gettext_lazy("Add Instances"),
+        child=serializers.CharField(label=gettext_lazy("Instance ID")),
+        default=list,
+    )
+    remove_instances = serializers.ListField(
+        label=gettext_lazy("Remove Instances"),
+        child=serializers.CharField(label=gettext_lazy("Instance ID")),
+        default=list,
+    )
+    all_instances = serializers.BooleanField(label=gettext_lazy("All Instances"), required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        data = super().validate(attrs)
+        data["add_bitmap"] = self.load_bitmap(data["action"], data["add_instances"])
+        data["remove_bitmap"] = self.load_bitmap(data["action"], data["remove_instances"])
+        return data
+
+
+class BulkAuthPermissionItemSerializer(serializers.Serializer):
+    """
+    Bulk Auth Permission Item
+    """
+
+    user = serializers.CharField(label=gettext_lazy("User"))
+    action = serializers.CharField(label=gettext_lazy("Action"))
+    add_instances = serializers.ListField(
+        label=gettext_lazy("Add Instances"),
+        child=serializers.CharField(label=gettext_lazy("Instance ID")),
+        default=list,
+    )
+    remove_instances = serializers.ListField(
+        label=gettext_lazy("Remove Instances"),
+        child=serializers.CharField(label=gettext_lazy("Instance ID")),
+        default=list,
+    )
+    all_instances = serializers.BooleanField(label=gettext_lazy("All Instances"), required=False)
+
+
+class BulkAuthPermissionSerializer(serializers.Serializer):
+    """
+    Bulk Auth Permission
+    """
+
+    permissions = BulkAuthPermissionItemSerializer(label=gettext_lazy("Permissions"), many=True, allow_empty=False)
+
+    def validate_permissions(self, permissions: List[dict]) -> List[dict]:
+        # users
+        usernames = {p["user"] for p in permissions}
+        missing_users = usernames - set(USER_MODEL.objects.filter(username__in=usernames).values_list("pk", flat=True))
+        if missing_users:
+            raise serializers.ValidationError("{} {}".format(UserNotExist.default_detail, sorted(missing_users)))
+
+        # actions
+        action_ids = {p["action"] for p in permissions}
+        actions = {a.id: a for a in Action.objects.filter(id__in=action_ids, application=self.context["application"])}
+        missing_actions = action_ids - set(actions.keys())
+        if missing_actions:
+            raise serializers.ValidationError(
+                "{} {}".format(ActionDoesNotExist.default_detail, sorted(missing_actions))
+            )
+
+        # instances
+        instance_ids = {i for p in permissions for i in [*p["add_instances"], *p["remove_instances"]]}
+        instance_map = {
+            instance_id: (resource_id, serial)
+            for (instance_id, resource_id, serial) in Instance.objects.filter(
+                id__in=instance_ids, application=self.context["application"]
+            ).values_list("id", "resource_id", "serial")
+        }
+
+        # bitmap
+        for p in permissions:
+            p["action"] = actions[p["action"]]
+            for field in ["add", "remove"]:
+                p[f"{field}_bitmap"] = Bitmap.from_members(
+                    instance_map[i][1]
+                    for i in p[f"{field}_instances"]
+                    if i in instance_map and instance_map[i][0] == p["action"].resource_id
+                )
+        return permissions
@@ -0,0 +1,379 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.account.models import User
+from apps.application.models import Application
+from apps.iam.constants import PermissionChangeOpChoices, PermissionStatusChoices
+from apps.iam.models import Action, Instance, PermissionChange, UserPermission
+from apps.iam.utils import (
+    PermissionIndexItem,
+    assign_change_cursors,
+    get_instance_keys,
+    get_users_allowed_permissions,
+    record_changes,
+    snapshot_cache,
+    sync_snapshot,
+)
+from core.bitmap import Bitmap
+from core.query_budget import QueryBudgetExceeded
+from core.utils import get_auth_token
+
+
+class IAMQueryBudgetTestCase(TestCase):
+    """
+    budgeted iam actions run in strict mode with cold cache, so exceeding budget fails the test
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "Admin", "password", is_superuser=True)
+        cls.users = [User.objects.create_user(f"user{i}", f"User{i}", "password") for i in range(5)]
+        cls.app = Application.objects.create(app_name="App", app_code="app", app_secret="secret", managers=[cls.admin])
+        cls.actions = [
+            Action.objects.create(
+                application=cls.app, action_id=f"action{i}", action_name=f"Action{i}", resource_id="resource"
+            )
+            for i in range(5)
+        ]
+        cls.instances = [
+            Instance.objects.create(
+                application=cls.app, resource_id="resource", instance_id=f"instance{i}", instance_name=f"Instance{i}"
+            )
+            for i in range(10)
+        ]
+        bitmap = Bitmap.from_members([instance.serial for instance in cls.instances[:3]]).dumps()
+        cls.permissions = [
+            UserPermission.objects.create(
+                user=user, action=action, instances_bitmap=bitmap, status=PermissionStatusChoices.ALLOWED
+            )
+            for user in [cls.admin, *cls.users]
+            for action in cls.actions
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.cookies[settings.AUTH_TOKEN_NAME] = get_auth_token(self.admin.username)
+        self.app_client = APIClient()
+        self.app_client.credentials(HTTP_OVINC_APP=json.dumps({"app_code": self.app.app_code, "app_secret": "secret"}))
+
+    def test_strict_mode(self):
+        self.assertTrue(settings.QUERY_BUDGET_ENABLED)
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+
+    def test_user_permission_list(self):
+        response = self.client.get("/iam/user/", {"application_id": self.app.app_code})
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_permission_update(self):
+        permission = self.permissions[0]
+        response = self.client.patch(
+            f"/iam/user/{permission.id}/", {"instances": [self.instances[5].id]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_manage_permission_list(self):
+        response = self.client.get("/iam/manage/", {"application_id": self.app.app_code})
+        self.assertEqual(response.status_code, 200)
+
+    def test_action_list(self):
+        response = self.client.get("/iam/action/", {"application_id": self.app.app_code})
+        self.assertEqual(response.status_code, 200)
+
+    def test_instance_list(self):
+        response = self.client.get("/iam/instance/", {"action_id": self.actions[0].id})
+        self.assertEqual(response.status_code, 200)
+
+    def test_check_permission_api(self):
+        response = self.app_client.post(
+            "/iam/check/api/",
+            {
+                "username": self.users[0].username,
+                "permissions": [
+                    {"action": self.actions[0].id, "instances": [self.instances[0].id]},
+                    {"action": self.actions[1].id, "instances": []},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_n_plus_one_detected(self):
+        # every permission loads its action lazily without select_related
+        with mock.patch.object(QuerySet, "select_related", lambda queryset, *fields: queryset):
+            with self.assertRaises(QueryBudgetExceeded) as context:
+                self.client.get("/iam/user/", {"application_id": self.app.app_code})
+        msg = str(context.exception)
+        self.assertIn("UserPermissionViewSet.list", msg)
+        # first repeat runs when instances of permissions are loaded, before serializing
+        self.assertIn(f"Repeated => {len(self.actions)}x - at apps/iam/models.py:", msg)
+
+
+class GrantPermissionTestCase(TestCase):
+    """
+    grants are checked through local index, so invalidation and missing rows are covered
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user", "User", "password")
+        cls.manager = User.objects.create_user("manager", "Manager", "password")
+        cls.app = Application.objects.create(
+            app_name="Grant", app_code="grant", app_secret="secret", managers=[cls.manager]
+        )
+        cls.action = Action.objects.create(
+            application=cls.app, action_id="action", action_name="Action", resource_id="resource"
+        )
+        cls.instances = [
+            Instance.objects.create(
+                application=cls.app, resource_id="resource", instance_id=f"instance{i}", instance_name=f"Instance{i}"
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.app_client = APIClient()
+        self.app_client.credentials(HTTP_OVINC_APP=json.dumps({"app_code": self.app.app_code, "app_secret": "secret"}))
+
+    def grant(self, path: str, data: dict) -> dict:
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.app_client.post(f"/iam/manage/{path}/", data, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def check(self, instance_ids: list) -> bool:
+        response = self.app_client.post(
+            "/iam/check/api/",
+            {"username": self.user.username, "permissions": [{"action": self.action.id, "instances": instance_ids}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data["permissions"][0]["is_allowed"]
+
+    def test_instance_created_after_check(self):
+        instance_id = "instance-created-after-check"
+        self.assertEqual(get_instance_keys([instance_id]), {instance_id: None})
+        self.assertFalse(self.check([instance_id]))
+        Instance.objects.create(
+            id=instance_id, application=self.app, resource_id="resource", instance_id="new", instance_name="New"
+        )
+        self.grant(
+            "auth",
+            {"user": self.user.username, "action": self.action.id, "instances": [instance_id], "all_instances": False},
+        )
+        self.assertTrue(self.check([instance_id]))
+
+    def test_delta_invalidates_index(self):
+        self.grant(
+            "auth",
+            {
+                "user": self.user.username,
+                "action": self.action.id,
+                "instances": [self.instances[0].id],
+                "all_instances": False,
+            },
+        )
+        self.assertTrue(self.check([self.instances[0].id]))
+        self.assertFalse(self.check([self.instances[1].id]))
+        self.grant(
+            "delta",
+            {
+                "user": self.user.username,
+                "action": self.action.id,
+                "add_instances": [self.instances[1].id],
+                "remove_instances": [self.instances[0].id],
+            },
+        )
+        self.assertFalse(self.check([self.instances[0].id]))
+        self.assertTrue(self.check([self.instances[1].id]))
+
+    def test_delta_remove_only_not_exists(self):
+        data = self.grant(
+            "delta", {"user": self.user.username, "action": self.action.id, "remove_instances": [self.instances[0].id]}
+        )
+        self.assertFalse(data)
+        self.assertFalse(UserPermission.objects.filter(user=self.user, action=self.action).exists())
+        self.assertFalse(self.check([]))
+
+    def test_bulk_auth_remove_only_not_exists(self):
+        data = self.grant(
+            "bulk_auth",
+            {
+                "permissions": [
+                    {"user": self.user.username, "action": self.action.id, "remove_instances": [self.instances[0].id]},
+                    {"user": self.manager.username, "action": self.action.id, "add_instances": [self.instances[0].id]},
+                ]
+            },
+        )
+        self.assertEqual(data, {"count": 1})
+        self.assertFalse(UserPermission.objects.filter(user=self.user, action=self.action).exists())
+        self.assertTrue(UserPermission.objects.filter(user=self.manager, action=self.action).exists())
+        self.assertFalse(self.check([]))
+
+
+class PermissionChangeFeedTestCase(TestCase):
+    """
+    feed is served by cursor assigned after committed
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user", "User", "password")
+        cls.app = Application.objects.create(app_name="Feed", app_code="feed", app_secret="secret", managers=[cls.user])
+        cls.action = Action.objects.create(
+            application=cls.app, action_id="action", action_name="Action", resource_id="resource"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.app_client = APIClient()
+        self.app_client.credentials(HTTP_OVINC_APP=json.dumps({"app_code": self.app.app_code, "app_secret": "secret"}))
+
+    def record(self, **kwargs) -> PermissionChange:
+        return PermissionChange.objects.create(
+            application=self.app, user=self.user, action=self.action, op=PermissionChangeOpChoices.ALLOW, **kwargs
+        )
+
+    def fetch(self, since: int, size: int = 10) -> dict:
+        response = self.app_client.get("/iam/change/", {"since": since, "size": size})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cursor_assigned_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record_changes(
+                [
+                    PermissionChange(
+                        application=self.app,
+                        user=self.user,
+                        action=self.action,
+                        op=PermissionChangeOpChoices.ALLOW,
+                    )
+                ]
+            )
+        self.assertEqual(self.fetch(0), {"next": 0, "has_more": False, "results": []})
+        for callback in callbacks:
+            callback()
+        data = self.fetch(0)
+        self.assertEqual(data["next"], 1)
+        self.assertEqual([change["cursor"] for change in data["results"]], [1])
+
+    def test_late_commit_not_skipped(self):
+        # smaller seq committed after larger one is still served after the consumer passed the larger one
+        self.record(seq=100)
+        assign_change_cursors([self.app.pk])
+        data = self.fetch(0)
+        self.assertEqual([change["seq"] for change in data["results"]], [100])
+        self.record(seq=50)
+        assign_change_cursors([self.app.pk])
+        data = self.fetch(data["next"])
+        self.assertEqual([(change["seq"], change["cursor"]) for change in data["results"]], [(50, 2)])
+        self.assertEqual(self.fetch(data["next"]), {"next": 2, "has_more": False, "results": []})
+
+    def test_page(self):
+        for _ in range(3):
+            self.record()
+        assign_change_cursors([self.app.pk])
+        data = self.fetch(0, size=2)
+        self.assertEqual((data["next"], data["has_more"]), (2, True))
+        data = self.fetch(data["next"], size=2)
+        self.assertEqual((data["next"], data["has_more"]), (3, False))
+
+    def test_deny_not_recorded(self):
+        permission = UserPermission.objects.create(
+            user=self.user, action=self.action, status=PermissionStatusChoices.DENIED
+        )
+        sync_snapshot([permission.id], PermissionStatusChoices.DENIED.value)
+        self.assertFalse(PermissionChange.objects.exists())
+
+
+@override_settings(IAM_SNAPSHOT_CACHE_ENABLED=True)
+class PermissionIndexTestCase(TestCase):
+    """
+    permissions are served by local index in front of redis snapshot, and invalidated by grants
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", f"User{i}", "password") for i in range(2)]
+        cls.app = Application.objects.create(
+            app_name="Index", app_code="index", app_secret="secret", managers=[cls.users[0]]
+        )
+        cls.action = Action.objects.create(
+            application=cls.app, action_id="action", action_name="Action", resource_id="resource"
+        )
+        cls.instances = [
+            Instance.objects.create(
+                application=cls.app, resource_id="resource", instance_id=f"instance{i}", instance_name=f"Instance{i}"
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        snapshot_cache.client.flushdb()
+        self.app_client = APIClient()
+        self.app_client.credentials(HTTP_OVINC_APP=json.dumps({"app_code": self.app.app_code, "app_secret": "secret"}))
+
+    def grant(self, username: str, instance_ids: list) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.app_client.post(
+                "/iam/manage/delta/",
+                {"user": username, "action": self.action.id, "add_instances": instance_ids},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def load(self, username: str) -> PermissionIndexItem:
+        return get_users_allowed_permissions({username: [self.action.id]})[(username, self.action.id)]
+
+    def rebuild(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            snapshot_cache.rebuild(batch_size=10)
+
+    def test_served_from_snapshot_cache(self):
+        self.grant(self.users[0].username, [self.instances[0].id])
+        self.rebuild()
+        with self.assertNumQueries(0):
+            item = self.load(self.users[0].username)
+        self.assertEqual(list(item.bitmap), [self.instances[0].serial])
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.load(self.users[1].username))
+
+    def test_invalidated_after_grant(self):
+        self.rebuild()
+        self.assertIsNone(self.load(self.users[0].username))
+        self.grant(self.users[0].username, [self.instances[0].id])
+        self.assertEqual(list(self.load(self.users[0].username).bitmap), [self.instances[0].serial])
+        self.grant(self.users[0].username, [self.instances[1].id])
+        self.assertEqual(
+            list(self.load(self.users[0].username).bitmap), [self.instances[0].serial, self.instances[1].serial]
+        )
+
+    def test_bulk_api(self):
+        self.grant(self.users[0].username, [self.instances[0].id])
+        check_permissions = [{"action": self.action.id, "instances": [self.instances[0].id, self.instances[1].id]}]
+        response = self.app_client.post(
+            "/iam/check/bulk_api/",
+            {"users": [{"username": user.username, "permissions": check_permissions} for user in self.users]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (result["username"], p["is_allowed"], p["apply_instances"])
+                for result in response.data
+                for p in result["permissions"]
+            ],
+            [
+                (self.users[0].username, False, [self.instances[1].id]),
+                (self.users[1].username, False, [self.instances[0].id, self.instances[1].id]),
+            ],
+        )
@@ -6,6 +6,7 @@ from apps.iam.views import (
     IAMInstanceAppViewSet,
     IAMInstanceViewSet,
     ManagerUserPermissionViewSet,
+    PermissionChangeViewSet,
     UserPermissionViewSet,
 )
 
@@ -16,5 +17,6 @@ router.register("instance_manage", IAMInstanceAppViewSet)
 router.register("user", UserPermissionViewSet)
 router.register("check", CheckPermissionViewSet)
 router.register("manage", ManagerUserPermissionViewSet)
+router.register("change", PermissionChangeViewSet)
 
 urlpatterns = router.urls
@@ -1,31 +1,386 @@
-from typing import List
+import base64
+import json
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
-from apps.iam.constants import PermissionStatusChoices
-from apps.iam.models import UserPermission, UserPermissionSnapshot
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
+
+from apps.iam.constants import (
+    PERMISSION_BULK_BATCH_SIZE,
+    PermissionCacheKey,
+    PermissionChangeOpChoices,
+    PermissionStatusChoices,
+)
+from apps.iam.models import (
+    Action,
+    Instance,
+    PermissionChange,
+    PermissionChangeSequence,
+    UserPermission,
+    UserPermissionBase,
+    UserPermissionSnapshot,
+)
+from core.async_cache import async_cache
+from core.bitmap import Bitmap
+from core.cache import LocalCache, VersionedLocalCache
 from core.logger import logger
 
 
+class PermissionIndexItem(NamedTuple):
+    """
+    Allowed Permission in Index
+    """
+
+    all_instances: bool
+    namespace: Tuple[str, str]
+    bitmap: Bitmap
+
+    def has_instance(self, instance_key: Optional[Tuple[str, str, int]]) -> bool:
+        """
+        check instance by (application_id, resource_id, serial)
+        """
+
+        if instance_key is None:
+            return False
+        application_id, resource_id, serial = instance_key
+        return (application_id, resource_id) == self.namespace and serial in self.bitmap
+
+
+permission_index = VersionedLocalCache(PermissionCacheKey.INDEX_VERSION, PermissionCacheKey.INDEX_MAX_SIZE)
+
+# namespace and serial of instance never change, so no invalidation is needed
+# instance not found is not cached, since it may be checked before it is created or committed
+instance_index = LocalCache(PermissionCacheKey.INSTANCE_MAX_SIZE, cache_missing=False)
+
+
+class SnapshotCache:
+    """
+    Materialized UserPermissionSnapshot in Redis
+    one hash for each user, mapping action id to packed [all_instances, application_id, resource_id, bitmap]
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return settings.IAM_SNAPSHOT_CACHE_ENABLED
+
+    @property
+    def client(self):
+        return get_redis_connection()
+
+    def cache_key(self, username: str) -> str:
+        return PermissionCacheKey.SNAPSHOT.format(username=username)
+
+    def pack(self, permission: UserPermissionBase) -> str:
+        application_id, resource_id = permission.instance_namespace
+        bitmap = base64.b64encode(bytes(permission.instances_bitmap or b"")).decode()
+        return json.dumps([permission.all_instances, application_id, resource_id, bitmap], separators=(",", ":"))
+
+    def unpack(self, value: bytes) -> PermissionIndexItem:
+        all_instances, application_id, resource_id, bitmap = json.loads(value)
+        return PermissionIndexItem(all_instances, (application_id, resource_id), Bitmap.loads(base64.b64decode(bitmap)))
+
+    def load(self, keys: List[Tuple[str, str]]) -> (bool, Dict[Tuple[str, str], PermissionIndexItem]):
+        """
+        load allowed permissions with one HMGET for each user in one round trip
+        return False if cache has not been built
+        """
+
+        user_action_ids = self._group_keys(keys)
+        pipeline = self._build_pipeline(self.client.pipeline(transaction=False), user_action_ids)
+        return self._parse_pipeline(user_action_ids, pipeline.execute())
+
+    async def aload(self, keys: List[Tuple[str, str]]) -> (bool, Dict[Tuple[str, str], PermissionIndexItem]):
+        """
+        async load
+        """
+
+        user_action_ids = self._group_keys(keys)
+        pipeline = self._build_pipeline(async_cache.client.pipeline(transaction=False), user_action_ids)
+        return self._parse_pipeline(user_action_ids, await pipeline.execute())
+
+    def _group_keys(self, keys: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+        user_action_ids = defaultdict(list)
+        for (username, action_id) in keys:
+            user_action_ids[username].append(action_id)
+        return user_action_ids
+
+    def _build_pipeline(self, pipeline, user_action_ids: Dict[str, List[str]]):
+        pipeline.exists(PermissionCacheKey.SNAPSHOT_READY)
+        for (username, action_ids) in user_action_ids.items():
+            pipeline.hmget(self.cache_key(username), action_ids)
+        return pipeline
+
+    def _parse_pipeline(
+        self, user_action_ids: Dict[str, List[str]], results: list
+    ) -> (bool, Dict[Tuple[str, str], PermissionIndexItem]):
+        is_ready, *values = results
+        if not is_ready:
+            return False, {}
+        permissions = {}
+        for ((username, action_ids), user_values) in zip(user_action_ids.items(), values):
+            for (action_id, value) in zip(action_ids, user_values):
+                if value is not None:
+                    permissions[(username, action_id)] = self.unpack(value)
+        return True, permissions
+
+    def save(self, permissions: Iterable[UserPermissionBase]) -> None:
+        """
+        save permissions to cache after current transaction committed
+        """
+
+        if not self.enabled:
+            return
+        permissions = list(permissions)
+        transaction.on_commit(lambda: self._save(permissions))
+
+    def _save(self, permissions: List[UserPermissionBase]) -> None:
+        pipeline = self.client.pipeline(transaction=False)
+        for p in permissions:
+            if p.status == PermissionStatusChoices.ALLOWED:
+                pipeline.hset(self.cache_key(p.user_id), p.action_id, self.pack(p))
+            else:
+                pipeline.hdel(self.cache_key(p.user_id), p.action_id)
+        # rebuild will not overwrite hash saved after it loaded from database
+        for username in {p.user_id for p in permissions}:
+            pipeline.hincrby(self.cache_key(username), PermissionCacheKey.SNAPSHOT_VERSION_FIELD, 1)
+        pipeline.execute()
+
+    def rebuild(self, batch_size: int) -> int:
+        """
+        rebuild cache from database, return count of users
+        """
+
+        # reads will fall back to database while rebuilding
+        self.client.delete(PermissionCacheKey.SNAPSHOT_READY)
+
+        # rebuild by user, users saved concurrently are retried
+        usernames = list(
+            UserPermissionSnapshot.objects.filter(status=PermissionStatusChoices.ALLOWED)
+            .values_list("user_id", flat=True)
+            .distinct()
+            .order_by("user_id")
+        )
+        for index in range(0, len(usernames), batch_size):
+            pending = usernames[index : index + batch_size]
+            for _ in range(PermissionCacheKey.SNAPSHOT_REBUILD_RETRIES):
+                pending = self._rebuild_users(pending)
+                if not pending:
+                    break
+            else:
+                logger.warning("[RebuildSnapshotCacheConflict] Users => %s", pending)
+
+        # mark ready and drop local index loaded from stale cache
+        self.client.set(PermissionCacheKey.SNAPSHOT_READY, 1)
+        permission_index.bump_version()
+        return len(usernames)
+
+    def _rebuild_users(self, usernames: List[str]) -> List[str]:
+        """
+        replace hashes of users if versions not changed since loaded from database, return users to retry
+        """
+
+        keys = [self.cache_key(username) for username in usernames]
+        # versions should be read before database, so saves committed after loading will change them
+        versions = self._get_versions(keys)
+        mappings = defaultdict(dict)
+        snapshots = UserPermissionSnapshot.objects.filter(
+            user_id__in=usernames, status=PermissionStatusChoices.ALLOWED
+        ).select_related("action")
+        for p in snapshots:
+            mappings[p.user_id][p.action_id] = self.pack(p)
+
+        with self.client.pipeline() as pipeline:
+            try:
+                pipeline.watch(*keys)
+                currents = self._get_versions(keys)
+                conflicts = [username for (username, v, c) in zip(usernames, versions, currents) if v != c]
+                # any save after watching will fail the whole transaction
+                pipeline.multi()
+                for (username, key, version, current) in zip(usernames, keys, versions, currents):
+                    if version != current:
+                        continue
+                    pipeline.delete(key)
+                    pipeline.hset(
+                        key, mapping={**mappings[username], PermissionCacheKey.SNAPSHOT_VERSION_FIELD: version or 0}
+                    )
+                pipeline.execute()
+            except WatchError:
+                return usernames
+        return conflicts
+
+    def _get_versions(self, keys: List[str]) -> List[Optional[bytes]]:
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.hget(key, PermissionCacheKey.SNAPSHOT_VERSION_FIELD)
+        return pipeline.execute()
+
+
+snapshot_cache = SnapshotCache()
+
+
+def _load_permission_index(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], PermissionIndexItem]:
+    # redis
+    if snapshot_cache.enabled:
+        is_ready, permissions = snapshot_cache.load(keys)
+        if is_ready:
+            return permissions
+
+    # database
+    snapshots = UserPermissionSnapshot.objects.filter(
+        user_id__in={username for (username, _) in keys},
+        action_id__in={action_id for (_, action_id) in keys},
+        status=PermissionStatusChoices.ALLOWED,
+    ).select_related("action")
+    return {
+        (p.user_id, p.action_id): PermissionIndexItem(p.all_instances, p.instance_namespace, p.bitmap)
+        for p in snapshots
+    }
+
+
+async def _aload_permission_index(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], PermissionIndexItem]:
+    # redis
+    if snapshot_cache.enabled:
+        is_ready, permissions = await snapshot_cache.aload(keys)
+        if is_ready:
+            return permissions
+
+    # database
+    snapshots = UserPermissionSnapshot.objects.filter(
+        user_id__in={username for (username, _) in keys},
+        action_id__in={action_id for (_, action_id) in keys},
+        status=PermissionStatusChoices.ALLOWED,
+    ).select_related("action")
+    return {
+        (p.user_id, p.action_id): PermissionIndexItem(p.all_instances, p.instance_namespace, p.bitmap)
+        async for p in snapshots
+    }
+
+
+def _load_instance_index(instance_ids: List[str]) -> Dict[str, Tuple[str, str, int]]:
+    instances = Instance.objects.filter(pk__in=instance_ids).values_list(
+        "id", "application_id", "resource_id", "serial"
+    )
+    return {
+        instance_id: (application_id, resource_id, serial)
+        for (instance_id, application_id, resource_id, serial) in instances
+    }
+
+
+async def _aload_instance_index(instance_ids: List[str]) -> Dict[str, Tuple[str, str, int]]:
+    instances = Instance.objects.filter(pk__in=instance_ids).values_list(
+        "id", "application_id", "resource_id", "serial"
+    )
+    return {
+        instance_id: (application_id, resource_id, serial)
+        async for (instance_id, application_id, resource_id, serial) in instances
+    }
+
+
+def get_users_allowed_permissions(user_action_ids: Dict[str, List[str]]) -> Dict[Tuple[str, str], PermissionIndexItem]:
+    """
+    load allowed permissions of users from process local index, missing permissions are loaded in one query
+    """
+
+    keys = [(username, action_id) for (username, action_ids) in user_action_ids.items() for action_id in action_ids]
+    return permission_index.load(keys, _load_permission_index)
+
+
+def get_instance_keys(instance_ids: Iterable[str]) -> Dict[str, Tuple[str, str, int]]:
+    """
+    load (application_id, resource_id, serial) of instances, instance not exists will be None
+    """
+
+    return instance_index.load(set(instance_ids), _load_instance_index)
+
+
+async def aget_users_allowed_permissions(
+    user_action_ids: Dict[str, List[str]]
+) -> Dict[Tuple[str, str], PermissionIndexItem]:
+    """
+    async get_users_allowed_permissions
+    """
+
+    keys = [(username, action_id) for (username, action_ids) in user_action_ids.items() for action_id in action_ids]
+    return await permission_index.aload(keys, _aload_permission_index)
+
+
+async def aget_instance_keys(instance_ids: Iterable[str]) -> Dict[str, Tuple[str, str, int]]:
+    """
+    async get_instance_keys
+    """
+
+    return await instance_index.aload(set(instance_ids), _aload_instance_index)
+
+
+def record_changes(changes: List[PermissionChange]) -> None:
+    """
+    append changes to feed in current transaction, so they are committed or rolled back with the permissions
+    cursors are assigned after committed
+    """
+
+    if not changes:
+        return
+    PermissionChange.objects.bulk_create(changes, batch_size=PERMISSION_BULK_BATCH_SIZE)
+    application_ids = {change.application_id for change in changes}
+    transaction.on_commit(lambda: assign_change_cursors(application_ids))
+
+
+def assign_change_cursors(application_ids: Iterable[str]) -> None:
+    """
+    assign cursors to committed changes, applications failed will be retried by the sweeper task
+    """
+
+    # applications are locked in order, so concurrent assigning never deadlocks
+    for application_id in sorted(application_ids):
+        try:
+            PermissionChangeSequence.assign_cursors(application_id)
+        except Exception as err:
+            logger.error("[AssignPermissionChangeCursorFailed] Application => %s; Error => %s", application_id, err)
+
+
 def sync_snapshot(permission_ids: List[str], action: str):
     def allow(p_map: dict):
         # init
-        to_update = list(UserPermissionSnapshot.objects.filter(id__in=p_map.keys()))
+        to_update = list(UserPermissionSnapshot.objects.filter(id__in=p_map.keys()).select_related("action"))
         to_update_ids = [p.id for p in to_update]
         to_create = [p for (p_id, p) in p_map.items() if p_id not in to_update_ids]
         # create
-        UserPermissionSnapshot.objects.bulk_create(to_create)
+        UserPermissionSnapshot.objects.bulk_create(to_create, batch_size=PERMISSION_BULK_BATCH_SIZE)
         # update
         for p in to_update:
-            p.instances = p_map[p.id].instances
+            p.instances_bitmap = p_map[p.id].instances_bitmap
             p.all_instances = p_map[p.id].all_instances
-        UserPermissionSnapshot.objects.bulk_update(to_update, fields=["instances", "all_instances", "update_at"])
+        UserPermissionSnapshot.objects.bulk_update(
+            to_update, fields=["instances_bitmap", "all_instances", "update_at"], batch_size=PERMISSION_BULK_BATCH_SIZE
+        )
+        snapshot_cache.save(to_create + to_update)
+        permission_index.bump_version()
+        record_changes(
+            [
+                PermissionChange(
+                    application_id=p.action.application_id,
+                    user_id=p.user_id,
+                    action_id=p.action_id,
+                    op=PermissionChangeOpChoices.ALLOW,
+                    instances_bitmap=p.instances_bitmap,
+                    all_instances=p.all_instances,
+                )
+                for p in to_create + to_update
+            ]
+        )
         # log
         logger.info("[SyncUserPermissionSnapshot] Allow => %s", p_map)
 
     def deny(p_map: dict):
+        # snapshot is kept, so nothing changes for readers of the feed
         logger.info("[SyncUserPermissionSnapshot] Deny => %s", p_map)
 
     # load permissions
-    permission_map = {p.id: p for p in UserPermission.objects.filter(id__in=permission_ids)}
+    permission_map = {p.id: p for p in UserPermission.objects.filter(id__in=permission_ids).select_related("action")}
 
     # action
     if action == PermissionStatusChoices.ALLOWED.value:
@@ -36,14 +391,112 @@ def sync_snapshot(permission_ids: List[str], action: str):
         logger.warning("[SyncUserPermissionSnapshot] Action Not Support => %s", action)
 
 
-def update_snapshot(permission_id: str, instances: List[str], all_instances: bool):
-    snapshot = UserPermissionSnapshot.objects.get(id=permission_id)
-    snapshot.instances = list(set(snapshot.instances) | set(instances))
-    snapshot.all_instances = all_instances
-    snapshot.save(update_fields=["instances", "all_instances", "update_at"])
+def update_snapshot(permission_id: str, add_bitmap: Bitmap, remove_bitmap: Bitmap, all_instances: bool):
+    update_snapshots({permission_id: (add_bitmap, remove_bitmap, all_instances)})
+
+
+def update_snapshots(deltas: Dict[str, Tuple[Bitmap, Bitmap, bool]]):
+    """
+    apply (add_bitmap, remove_bitmap, all_instances) to snapshot of each permission, missing snapshot will be skipped
+    """
+
+    if not deltas:
+        return
+    snapshots = list(UserPermissionSnapshot.objects.filter(id__in=deltas.keys()).select_related("action"))
+    now = timezone.now()
+    for snapshot in snapshots:
+        add_bitmap, remove_bitmap, all_instances = deltas[snapshot.id]
+        snapshot.bitmap = (snapshot.bitmap | add_bitmap) - remove_bitmap
+        snapshot.all_instances = all_instances
+        snapshot.update_at = now
+    UserPermissionSnapshot.objects.bulk_update(
+        snapshots, fields=["instances_bitmap", "all_instances", "update_at"], batch_size=PERMISSION_BULK_BATCH_SIZE
+    )
+    snapshot_cache.save(snapshots)
+    permission_index.bump_version()
+    record_changes(
+        [
+            PermissionChange(
+                application_id=snapshot.action.application_id,
+                user_id=snapshot.user_id,
+                action_id=snapshot.action_id,
+                op=PermissionChangeOpChoices.UPDATE,
+                instances_bitmap=deltas[snapshot.id][0].dumps(),
+                removed_bitmap=deltas[snapshot.id][1].dumps(),
+                all_instances=snapshot.all_instances,
+            )
+            for snapshot in snapshots
+        ]
+    )
     logger.info(
-        "[SyncUserPermissionSnapshot] Update => %s; Instances => %s; AllInstances => %s",
-        permission_id,
-        instances,
-        all_instances,
+        "[SyncUserPermissionSnapshot] Update => %s; Skip => %s",
+        {
+            p_id: (list(add_bitmap), list(remove_bitmap), all_instances)
+            for (p_id, (add_bitmap, remove_bitmap, all_instances)) in deltas.items()
+        },
+        set(deltas.keys()) - {snapshot.id for snapshot in snapshots},
     )
+
+
+def grant_permissions(grants: List[Tuple[str, Action, Bitmap, Bitmap, Optional[bool]]]) -> List[UserPermission]:
+    """
+    apply (username, action, add_bitmap, remove_bitmap, all_instances) to permissions, all_instances is kept if None
+    permission not exists will be created as allowed, unless nothing is granted
+    should be called in transaction, exist permissions are locked until committed, so concurrent grants never overwrite
+    each grant rewrites the whole bitmap, so it costs O(max serial) of the namespace rather than O(delta)
+    return created and updated permissions
+    """
+
+    # lock exist permissions in order of id, action is not joined so it will not be locked
+    actions = {action.id: action for (_, action, *_) in grants}
+    permissions = {}
+    for p in (
+        UserPermission.objects.select_for_update()
+        .filter(user_id__in={username for (username, *_) in grants}, action_id__in=actions.keys())
+        .order_by("id")
+    ):
+        p.action = actions[p.action_id]
+        permissions[(p.user_id, p.action_id)] = p
+
+    # apply changes, grants of the same permission are merged in order
+    to_create = {}
+    to_update = {}
+    deltas = {}
+    for (username, action, add_bitmap, remove_bitmap, all_instances) in grants:
+        key = (username, action.id)
+        permission = permissions.get(key)
+        if permission is None:
+            # nothing to allow for permission not exists
+            if not (add_bitmap - remove_bitmap) and not all_instances:
+                continue
+            permission = UserPermission(user_id=username, action=action, status=PermissionStatusChoices.ALLOWED)
+            permissions[key] = permission
+            to_create[key] = permission
+        permission.bitmap = (permission.bitmap | add_bitmap) - remove_bitmap
+        if all_instances is not None:
+            permission.all_instances = all_instances
+        if key in to_create:
+            continue
+        to_update[key] = permission
+        pre_add_bitmap, pre_remove_bitmap, _ = deltas.get(permission.id, (Bitmap(), Bitmap(), None))
+        add_bitmap = (pre_add_bitmap - remove_bitmap) | (add_bitmap - remove_bitmap)
+        remove_bitmap = (pre_remove_bitmap | remove_bitmap) - add_bitmap
+        deltas[permission.id] = (add_bitmap, remove_bitmap, permission.all_instances)
+
+    # save
+    now = timezone.now()
+    for permission in to_update.values():
+        permission.update_at = now
+    UserPermission.objects.bulk_create(to_create.values(), batch_size=PERMISSION_BULK_BATCH_SIZE)
+    UserPermission.objects.bulk_update(
+        to_update.values(),
+        fields=["instances_bitmap", "all_instances", "update_at"],
+        batch_size=PERMISSION_BULK_BATCH_SIZE,
+    )
+
+    # sync snapshot
+    update_snapshots(deltas)
+    if to_create:
+        sync_snapshot([p.id for p in to_create.values()], PermissionStatusChoices.ALLOWED.value)
+
+    return [*to_create.values(), *to_update.values()]
@@ -1,4 +1,5 @@
 from apps.iam.views.action import IAMActionViewSet
+from apps.iam.views.change import PermissionChangeViewSet
 from apps.iam.views.instance import IAMInstanceAppViewSet, IAMInstanceViewSet
 from apps.iam.views.user import (
     CheckPermissionViewSet,
@@ -13,4 +14,5 @@ __all__ = [
     "UserPermissionViewSet",
     "CheckPermissionViewSet",
     "ManagerUserPermissionViewSet",
+    "PermissionChangeViewSet",
 ]
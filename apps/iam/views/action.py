@@ -10,7 +10,8 @@ from apps.iam.serializers import (
     ActionListRequestSerializer,
     ActionUpdateSerializer,
 )
-from core.constants import ViewActionChoices
+from core.constants import LONG_CACHE_TIMEOUT, ViewActionChoices
+from core.query_budget import query_budget
 from core.viewsets import (
     CreateMixin,
     DestroyMixin,
@@ -36,6 +37,7 @@ class IAMActionViewSet(RetrieveMixin, ListMixin, CreateMixin, UpdateMixin, Destr
             return [IAMUpdatePermission()]
         return []
 
+    @query_budget(3)
     def list(self, request, *args, **kwargs):
         """
         action list
@@ -93,7 +95,7 @@ class IAMActionViewSet(RetrieveMixin, ListMixin, CreateMixin, UpdateMixin, Destr
         # response
         return Response(ActionInfoSerializer(instance).data)
 
-    @action(methods=["GET"], detail=False)
+    @action(methods=["GET"], detail=False, enable_cache=True, cache_timeout=LONG_CACHE_TIMEOUT, cache_models=[Action])
     def all(self, request, *args, **kwargs):
         """
         action list
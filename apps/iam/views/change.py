@@ -0,0 +1,49 @@
+from rest_framework.response import Response
+
+from apps.iam.models import Instance, PermissionChange
+from apps.iam.serializers import (
+    PermissionChangeListRequestSerializer,
+    PermissionChangeSerializer,
+)
+from core.auth import ApplicationAuthenticate
+from core.viewsets import ListMixin, MainViewSet
+
+
+class PermissionChangeViewSet(ListMixin, MainViewSet):
+    """
+    Permission Change Feed
+    """
+
+    queryset = PermissionChange.get_queryset()
+    serializer_class = PermissionChangeSerializer
+    authentication_classes = [ApplicationAuthenticate]
+
+    def list(self, request, *args, **kwargs):
+        """
+        changes of current application after cursor
+        """
+
+        # validate request
+        request_serializer = PermissionChangeListRequestSerializer(data=request.query_params)
+        request_serializer.is_valid(raise_exception=True)
+        request_data = request_serializer.validated_data
+
+        # load changes, cursor is assigned after committed, so no smaller one will be visible later
+        changes = list(
+            PermissionChange.objects.filter(application=request.user, cursor__gt=request_data["since"])
+            .select_related("action")
+            .order_by("cursor")[: request_data["size"]]
+        )
+
+        # instance data
+        instance_map = Instance.load_by_permissions(changes)
+
+        # response
+        serializer = PermissionChangeSerializer(changes, many=True, context=instance_map)
+        return Response(
+            {
+                "next": changes[-1].cursor if changes else request_data["since"],
+                "has_more": len(changes) == request_data["size"],
+                "results": serializer.data,
+            }
+        )
@@ -12,7 +12,9 @@ from apps.iam.serializers import (
     InstanceUpdateSerializer,
 )
 from core.auth import ApplicationAuthenticate
-from core.constants import ViewActionChoices
+from core.constants import LONG_CACHE_TIMEOUT, ViewActionChoices
+from core.paginations import KeysetPagination
+from core.query_budget import query_budget
 from core.viewsets import CreateMixin, DestroyMixin, ListMixin, MainViewSet, UpdateMixin
 
 
@@ -23,7 +25,9 @@ class IAMInstanceViewSet(ListMixin, MainViewSet):
 
     queryset = Instance.get_queryset()
     serializer_class = InstanceSerializer
+    pagination_class = KeysetPagination
 
+    @query_budget(5)
     def list(self, request, *args, **kwargs):
         """
         Instance List
@@ -49,7 +53,13 @@ class IAMInstanceViewSet(ListMixin, MainViewSet):
         # response
         return self.get_paginated_response(data)
 
-    @action(methods=["GET"], detail=False)
+    @action(
+        methods=["GET"],
+        detail=False,
+        enable_cache=True,
+        cache_timeout=LONG_CACHE_TIMEOUT,
+        cache_models=[Action, Instance],
+    )
     def all(self, request, *args, **kwargs):
         """
         All Instance
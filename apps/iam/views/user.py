@@ -1,4 +1,5 @@
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Set
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
@@ -7,12 +8,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from apps.iam.constants import PermissionStatusChoices
-from apps.iam.models import Action, Instance, UserPermission, UserPermissionSnapshot
+from apps.iam.models import Action, Instance, UserPermission
 from apps.iam.permissions import ManagePermissionPermission, UserPermissionSelf
 from apps.iam.serializers import (
     ApplyPermissionSerializer,
     AuthPermissionSerializer,
+    BulkAuthPermissionSerializer,
+    BulkCheckPermissionSerializer,
     CheckPermissionSerializer,
+    DeltaPermissionSerializer,
     ManagePermissionApplySerializer,
     ManagePermissionSerializer,
     PermissionItemSerializer,
@@ -21,10 +25,28 @@ from apps.iam.serializers import (
     UserPermissionListSerializer,
     UserPermissionSerializer,
 )
-from apps.iam.utils import sync_snapshot, update_snapshot
+from apps.iam.utils import (
+    PermissionIndexItem,
+    aget_instance_keys,
+    aget_users_allowed_permissions,
+    get_instance_keys,
+    get_users_allowed_permissions,
+    grant_permissions,
+    sync_snapshot,
+)
 from core.auth import ApplicationAuthenticate
+from core.bitmap import Bitmap
 from core.constants import ViewActionChoices
-from core.viewsets import CreateMixin, DestroyMixin, ListMixin, MainViewSet, UpdateMixin
+from core.paginations import KeysetPagination
+from core.query_budget import query_budget
+from core.viewsets import (
+    AsyncMainViewSet,
+    CreateMixin,
+    DestroyMixin,
+    ListMixin,
+    MainViewSet,
+    UpdateMixin,
+)
 
 USER_MODEL = get_user_model()
 
@@ -34,7 +56,7 @@ class UserPermissionViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, M
     User Permission
     """
 
-    queryset = UserPermission.get_queryset()
+    queryset = UserPermission.get_queryset().select_related("action")
     serializer_class = UserPermissionSerializer
 
     def get_permissions(self):
@@ -42,6 +64,7 @@ class UserPermissionViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, M
             return [UserPermissionSelf()]
         return []
 
+    @query_budget(4)
     def list(self, request, *args, **kwargs):
         """
         current user permission list
@@ -62,11 +85,7 @@ class UserPermissionViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, M
         page = self.paginate_queryset(queryset)
 
         # instance data
-        instance_ids = []
-        for up in page:
-            instance_ids.extend(up.instances if up.instances else [])
-        instances = Instance.objects.filter(pk__in=instance_ids)
-        instance_map = {instance.pk: instance for instance in instances}
+        instance_map = Instance.load_by_permissions(page)
 
         # serialize
         serializer = UserPermissionListSerializer(page, many=True, context=instance_map)
@@ -89,6 +108,7 @@ class UserPermissionViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, M
 
         return Response()
 
+    @query_budget(5)
     def update(self, request, *args, **kwargs):
         """
         update permission
@@ -107,11 +127,7 @@ class UserPermissionViewSet(ListMixin, CreateMixin, UpdateMixin, DestroyMixin, M
         instance = request_serializer.save()
 
         # instance data
-        if instance.instances:
-            instances = Instance.objects.filter(pk__in=instance.instances)
-            instance_map = {instance.pk: instance for instance in instances}
-        else:
-            instance_map = {}
+        instance_map = Instance.load_by_permissions([instance])
 
         # serialize
         serializer = UserPermissionListSerializer(instance, context=instance_map)
@@ -125,12 +141,14 @@ class ManagerUserPermissionViewSet(ListMixin, CreateMixin, MainViewSet):
 
     queryset = UserPermission.get_queryset()
     serializer_class = UserPermissionSerializer
+    pagination_class = KeysetPagination
 
     def get_permissions(self):
-        if self.action in ["auth"]:
+        if self.action in ["auth", "delta", "bulk_auth"]:
             return []
         return [ManagePermissionPermission()]
 
+    @query_budget(4)
     def list(self, request, *args, **kwargs):
         """
         List User Permission
@@ -153,11 +171,7 @@ class ManagerUserPermissionViewSet(ListMixin, CreateMixin, MainViewSet):
         page = self.paginate_queryset(user_permissions)
 
         # instance data
-        instance_ids = []
-        for up in page:
-            instance_ids.extend(up.instances if up.instances else [])
-        instances = Instance.objects.filter(pk__in=instance_ids)
-        instance_map = {instance.pk: instance for instance in instances}
+        instance_map = Instance.load_by_permissions(page)
 
         # response
         serializer = UserPermissionListSerializer(page, many=True, context=instance_map)
@@ -198,34 +212,84 @@ class ManagerUserPermissionViewSet(ListMixin, CreateMixin, MainViewSet):
         request_serializer.is_valid(raise_exception=True)
         request_data = request_serializer.validated_data
 
-        # get exist permission
-        permission = UserPermission.objects.filter(user=request_data["user"], action=request_data["action"]).first()
-
-        # if exists, update
-        if permission:
-            permission.instances = list(set(permission.instances) | set(request_data["instances"]))
-            permission.all_instances = request_data["all_instances"]
-            permission.save(update_fields=["instances", "all_instances", "update_at"])
-            update_snapshot(permission.id, request_data["instances"], request_data["all_instances"])
-        # if not exists, create and set allowed
-        else:
-            permission = UserPermission.objects.create(
-                user=request_data["user"],
-                action=request_data["action"],
-                instances=request_data["instances"],
-                all_instances=request_data["all_instances"],
-                status=PermissionStatusChoices.ALLOWED,
-            )
-            sync_snapshot([permission.id], PermissionStatusChoices.ALLOWED.value)
+        # grant
+        permissions = grant_permissions(
+            [
+                (
+                    request_data["user"].username,
+                    request_data["action"],
+                    request_data["bitmap"],
+                    Bitmap(),
+                    request_data["all_instances"],
+                )
+            ]
+        )
 
-        # response
-        serializer = UserPermissionSerializer(permission)
+        # response, nothing is granted for permission not exists
+        if not permissions:
+            return Response()
+        serializer = UserPermissionSerializer(permissions[0])
         return Response(serializer.data)
 
+    @transaction.atomic()
+    @action(methods=["POST"], detail=False, authentication_classes=[ApplicationAuthenticate])
+    def delta(self, request, *args, **kwargs):
+        """
+        add or remove instances of permission
+        """
+
+        # validate request
+        request_serializer = DeltaPermissionSerializer(data=request.data, context={"application": request.user})
+        request_serializer.is_valid(raise_exception=True)
+        request_data = request_serializer.validated_data
+
+        # grant
+        permissions = grant_permissions(
+            [
+                (
+                    request_data["user"].username,
+                    request_data["action"],
+                    request_data["add_bitmap"],
+                    request_data["remove_bitmap"],
+                    request_data.get("all_instances"),
+                )
+            ]
+        )
+
+        # response, nothing is granted for permission not exists
+        if not permissions:
+            return Response()
+        serializer = UserPermissionSerializer(permissions[0])
+        return Response(serializer.data)
+
+    @transaction.atomic()
+    @action(methods=["POST"], detail=False, authentication_classes=[ApplicationAuthenticate])
+    def bulk_auth(self, request, *args, **kwargs):
+        """
+        add or remove instances of permissions in bulk
+        """
+
+        # validate request
+        request_serializer = BulkAuthPermissionSerializer(data=request.data, context={"application": request.user})
+        request_serializer.is_valid(raise_exception=True)
+        request_data = request_serializer.validated_data
+
+        # grant
+        permissions = grant_permissions(
+            [
+                (p["user"], p["action"], p["add_bitmap"], p["remove_bitmap"], p.get("all_instances"))
+                for p in request_data["permissions"]
+            ]
+        )
+
+        # response
+        return Response({"count": len(permissions)})
+
 
-class CheckPermissionViewSet(CreateMixin, MainViewSet):
+class CheckPermissionViewSet(CreateMixin, AsyncMainViewSet):
     """
     Check Permission
+    handlers share validation and checking, only loading of async twins runs in event loop
     """
 
     queryset = UserPermission.get_queryset()
@@ -236,45 +300,118 @@ class CheckPermissionViewSet(CreateMixin, MainViewSet):
         check user permission
         """
 
-        # validate request
-        request_serializer = PermissionItemSerializer(data=request.data, many=True)
-        request_serializer.is_valid(raise_exception=True)
-        data = request_serializer.validated_data
+        [result] = self._check([self._validate_create(request)])
+        return Response(result)
 
-        # check
-        return self._check(request.user.username, data)
-
-    @action(methods=["POST"], detail=False, authentication_classes=[ApplicationAuthenticate])
+    @action(methods=["POST"], detail=False, authentication_classes=[ApplicationAuthenticate], query_budget=3)
     def api(self, request, *args, **kwargs):
         """
         check permission api
         """
 
-        # validate request
+        [result] = self._check([self._validate_api(request)])
+        return Response(result)
+
+    @action(methods=["POST"], detail=False, authentication_classes=[ApplicationAuthenticate])
+    def bulk_api(self, request, *args, **kwargs):
+        """
+        check permission api for multiple users
+        """
+
+        return Response(self._check(self._validate_bulk_api(request)))
+
+    @action(methods=["GET"], detail=False)
+    def is_superuser(self, request, *args, **kwargs):
+        """
+        check user is superuser
+        """
+
+        return Response({"is_superuser": request.user.is_superuser})
+
+    async def acreate(self, request, *args, **kwargs):
+        [result] = await self._acheck([self._validate_create(request)])
+        return Response(result)
+
+    async def aapi(self, request, *args, **kwargs):
+        [result] = await self._acheck([self._validate_api(request)])
+        return Response(result)
+
+    async def abulk_api(self, request, *args, **kwargs):
+        return Response(await self._acheck(self._validate_bulk_api(request)))
+
+    async def ais_superuser(self, request, *args, **kwargs):
+        return self.is_superuser(request, *args, **kwargs)
+
+    def _validate_create(self, request) -> dict:
+        request_serializer = PermissionItemSerializer(data=request.data, many=True)
+        request_serializer.is_valid(raise_exception=True)
+        return {"username": request.user.username, "permissions": request_serializer.validated_data}
+
+    def _validate_api(self, request) -> dict:
         request_serializer = CheckPermissionSerializer(data=request.data)
         request_serializer.is_valid(raise_exception=True)
-        data = request_serializer.validated_data
+        return request_serializer.validated_data
+
+    def _validate_bulk_api(self, request) -> List[dict]:
+        request_serializer = BulkCheckPermissionSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+        return request_serializer.validated_data["users"]
+
+    def _check(self, items: List[dict]) -> List[dict]:
+        """
+        check permissions of users, each item is {"username": username, "permissions": permissions}
+        """
+
+        user_action_ids, instance_ids = self._build_check_keys(items)
+        allowed_permissions_map = get_users_allowed_permissions(user_action_ids)
+        instance_keys = get_instance_keys(instance_ids)
+        return self._build_check_results(items, allowed_permissions_map, instance_keys)
+
+    async def _acheck(self, items: List[dict]) -> List[dict]:
+        """
+        check permissions of users in event loop
+        """
 
-        # check
-        return self._check(data["username"], data["permissions"])
+        user_action_ids, instance_ids = self._build_check_keys(items)
+        allowed_permissions_map = await aget_users_allowed_permissions(user_action_ids)
+        instance_keys = await aget_instance_keys(instance_ids)
+        return self._build_check_results(items, allowed_permissions_map, instance_keys)
 
-    def _check(self, username, check_permissions: List[dict]) -> Response:
+    def _build_check_keys(self, items: List[dict]) -> (Dict[str, List[str]], Set[str]):
         """
-        check permission
+        action ids of each user and instance ids to load
         """
 
-        # load permission
-        action_ids = [p["action"] for p in check_permissions]
-        allowed_permissions_map = {
-            p.action_id: p
-            for p in UserPermissionSnapshot.objects.filter(
-                user_id=username, action_id__in=action_ids, status=PermissionStatusChoices.ALLOWED
-            )
-        }
+        user_action_ids = defaultdict(list)
+        for item in items:
+            user_action_ids[item["username"]].extend(p["action"] for p in item["permissions"])
+        instance_ids = {i for item in items for p in item["permissions"] for i in p["instances"]}
+        return user_action_ids, instance_ids
+
+    def _build_check_results(self, items: List[dict], allowed_permissions_map: dict, instance_keys: dict) -> List[dict]:
+        """
+        check items with loaded permissions and instances
+        """
+
+        results = []
+        for item in items:
+            user_permissions_map = {
+                p["action"]: allowed_permissions_map.get((item["username"], p["action"])) for p in item["permissions"]
+            }
+            self._check_permissions(item["permissions"], user_permissions_map, instance_keys)
+            results.append({"username": item["username"], "permissions": item["permissions"]})
+        return results
+
+    def _check_permissions(
+        self, check_permissions: List[dict], allowed_permissions_map: dict, instance_keys: dict
+    ) -> None:
+        """
+        check permissions with allowed permissions, result will be set to each permission
+        instance_keys maps instance id to (application_id, resource_id, serial)
+        """
 
-        # check permission
         for p in check_permissions:
-            allowed_permission: UserPermissionSnapshot = allowed_permissions_map.get(p["action"])
+            allowed_permission: PermissionIndexItem = allowed_permissions_map.get(p["action"])
             # none match
             if not allowed_permission:
                 p["is_allowed"] = False
@@ -286,16 +423,7 @@ class CheckPermissionViewSet(CreateMixin, MainViewSet):
                 p["apply_instances"] = []
                 continue
             # match permission, check instances
-            p["apply_instances"] = list(set(p["instances"]) - set(allowed_permission.instances))
+            p["apply_instances"] = [
+                i for i in dict.fromkeys(p["instances"]) if not allowed_permission.has_instance(instance_keys.get(i))
+            ]
             p["is_allowed"] = not bool(p["apply_instances"])
-
-        # response
-        return Response({"username": username, "permissions": check_permissions})
-
-    @action(methods=["GET"], detail=False)
-    def is_superuser(self, request, *args, **kwargs):
-        """
-        check user is superuser
-        """
-
-        return Response({"is_superuser": request.user.is_superuser})
@@ -0,0 +1,116 @@
+import datetime
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterator, NamedTuple
+
+from django.conf import settings
+
+from core.logger import logger
+
+
+class AccessLogRecord(NamedTuple):
+    """
+    Access Log Record
+    timestamp is unix time in seconds, latency in ms and sizes in bytes
+    """
+
+    timestamp: float
+    user: str
+    method: str
+    path: str
+    route: str
+    status: int
+    latency: float
+    request_size: int
+    response_size: int
+    trace_id: str
+
+
+class AccessLogWriter:
+    """
+    Write Access Log in Background Thread
+    records are batched into append-only json lines segments, one segment for each process and hour
+    records are dropped when the bounded queue is full
+    """
+
+    segment_name = "access-{hour}-{pid}.jsonl"
+    segment_pattern = "access-*.jsonl"
+
+    def __init__(self) -> None:
+        self._pid = None
+        self._queue = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def write(self, record: AccessLogRecord) -> None:
+        # writer thread does not survive fork, so start it in each process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._queue = queue.Queue(settings.ACCESS_LOG_QUEUE_SIZE)
+        os.makedirs(settings.ACCESS_LOG_DIR, exist_ok=True)
+        thread = threading.Thread(target=self._run, args=(self._queue,), name="access-log-writer", daemon=True)
+        thread.start()
+
+    def _run(self, records: queue.Queue) -> None:
+        while True:
+            batch = [records.get()]
+            deadline = time.monotonic() + settings.ACCESS_LOG_FLUSH_INTERVAL
+            while len(batch) < settings.ACCESS_LOG_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(records.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception as err:
+                logger.error("[AccessLogFlushFailed] Records => %s; Error => %s", len(batch), err)
+
+    def _flush(self, batch: list) -> None:
+        segments = {}
+        for record in batch:
+            hour = datetime.datetime.fromtimestamp(record.timestamp).strftime("%Y%m%d%H")
+            segments.setdefault(hour, []).append(json.dumps(record._asdict(), ensure_ascii=False))
+        for (hour, lines) in segments.items():
+            path = os.path.join(settings.ACCESS_LOG_DIR, self.segment_name.format(hour=hour, pid=self._pid))
+            with open(path, "a", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+
+    @classmethod
+    def read(cls, since: float = 0) -> Iterator[AccessLogRecord]:
+        """
+        read records after since from segments, ordered by segment hour
+        """
+
+        since_hour = datetime.datetime.fromtimestamp(since).strftime("%Y%m%d%H")
+        paths = sorted(glob.glob(os.path.join(settings.ACCESS_LOG_DIR, cls.segment_pattern)))
+        for path in paths:
+            # access-{hour}-{pid}.jsonl
+            if os.path.basename(path).split("-")[1] < since_hour:
+                continue
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = AccessLogRecord(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue
+                    if record.timestamp >= since:
+                        yield record
+
+
+access_log_writer = AccessLogWriter()
@@ -0,0 +1,71 @@
+import asyncio
+import weakref
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django_redis.cache import RedisCache
+from redis.asyncio import Redis
+
+from core.metrics import AsyncCountedRedis
+
+
+class AsyncCache:
+    """
+    Async Client of Django Cache
+    keys and values are compatible with django-redis, redis client is bound to event loop so one is kept for each loop
+    other backends, such as local memory cache of benchmark, are called in thread
+    """
+
+    def __init__(self, alias: str = "default") -> None:
+        self.alias = alias
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def client(self) -> Redis:
+        """
+        raw redis client of current event loop, same as get_redis_connection in sync code
+        """
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = AsyncCountedRedis.from_url(settings.CACHES[self.alias]["LOCATION"])
+        return client
+
+    @property
+    def is_redis(self) -> bool:
+        return isinstance(self.cache, RedisCache)
+
+    async def get(self, key: str, default: any = None) -> any:
+        if not self.is_redis:
+            return await sync_to_async(self.cache.get)(key, default)
+        value = await self.client.get(self.cache.make_key(key))
+        if value is None:
+            return default
+        return self.cache.client.decode(value)
+
+    async def get_with_ttl(self, key: str) -> (any, Optional[float]):
+        """
+        value and remaining timeout (seconds) of key in one round trip, timeout is None if key never expires
+        timeout is unknown and always None for other backends
+        """
+
+        if not self.is_redis:
+            return await sync_to_async(self.cache.get)(key), None
+        redis_key = self.cache.make_key(key)
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.get(redis_key)
+        pipeline.pttl(redis_key)
+        value, pttl = await pipeline.execute()
+        if value is None:
+            return None, None
+        return self.cache.client.decode(value), (pttl / 1000 if pttl >= 0 else None)
+
+
+async_cache = AsyncCache()
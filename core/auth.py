@@ -1,15 +1,16 @@
 import json
 from typing import Union
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.utils.translation import gettext
 from rest_framework.authentication import BaseAuthentication, SessionAuthentication
 
 from apps.application.models import Application
 from core.constants import APP_AUTH_HEADER_KEY, APP_AUTH_ID_KEY, APP_AUTH_SECRET_KEY
 from core.exceptions import AppAuthFailed, LoginRequired
+from core.model_cache import model_cache
 
 AUTH_TOKEN_CHECK_KEY = "_auth_token_authenticated"
 USER_MODEL = get_user_model()
@@ -26,7 +27,7 @@ class SessionAuthenticate(SessionAuthentication):
         if not auth_token:
             return None
         # Verify Auth Token
-        username = cache.get(auth_token)
+        username = model_cache.get(auth_token)
         if not username:
             return None
         # Get User
@@ -37,6 +38,23 @@ class SessionAuthenticate(SessionAuthentication):
         setattr(user, AUTH_TOKEN_CHECK_KEY, True)
         return user, None
 
+    async def aauthenticate(self, request) -> Union[tuple, None]:
+        # Get Auth Token
+        auth_token = request.COOKIES.get(settings.AUTH_TOKEN_NAME, None)
+        if not auth_token:
+            return None
+        # Verify Auth Token
+        username = await model_cache.aget(auth_token)
+        if not username:
+            return None
+        # Get User
+        try:
+            user = await USER_MODEL.objects.aget_cache_instance(username)
+        except USER_MODEL.DoesNotExist:
+            return None
+        setattr(user, AUTH_TOKEN_CHECK_KEY, True)
+        return user, None
+
 
 class AuthTokenAuthenticate(BaseAuthentication):
     """
@@ -52,6 +70,9 @@ class AuthTokenAuthenticate(BaseAuthentication):
             return user, None
         raise LoginRequired()
 
+    async def aauthenticate(self, request) -> (USER_MODEL, None):
+        return self.authenticate(request)
+
 
 class ApplicationAuthenticate(BaseAuthentication):
     """
@@ -59,14 +80,7 @@ class ApplicationAuthenticate(BaseAuthentication):
     """
 
     def authenticate(self, request) -> (Application, None):
-        # get app params
-        app_params = json.loads(request.META.get(APP_AUTH_HEADER_KEY, "{}"))
-        if not isinstance(app_params, dict):
-            raise AppAuthFailed(gettext("App Auth Params is not Json"))
-        app_code = app_params.get(APP_AUTH_ID_KEY)
-        app_secret = app_params.get(APP_AUTH_SECRET_KEY)
-        if not app_code or not app_secret:
-            raise AppAuthFailed(gettext("App Auth Params Not Exist"))
+        app_code, app_secret = self.get_app_params(request)
         # varify app
         try:
             app = Application.objects.get_cache_instance(app_code)
@@ -76,3 +90,30 @@ class ApplicationAuthenticate(BaseAuthentication):
         if app.check_secret(app_secret):
             return app, None
         raise AppAuthFailed(gettext("App Code or Secret Incorrect"))
+
+    async def aauthenticate(self, request) -> (Application, None):
+        app_code, app_secret = self.get_app_params(request)
+        # varify app
+        try:
+            app = await Application.objects.aget_cache_instance(app_code)
+        except Application.DoesNotExist:
+            raise AppAuthFailed(gettext("App Not Exist"))
+        # verify secret, password hashing would block event loop
+        if settings.ENCRYPT_APP_SECRET:
+            is_valid = await sync_to_async(app.check_secret, thread_sensitive=False)(app_secret)
+        else:
+            is_valid = app.check_secret(app_secret)
+        if is_valid:
+            return app, None
+        raise AppAuthFailed(gettext("App Code or Secret Incorrect"))
+
+    def get_app_params(self, request) -> (str, str):
+        # get app params
+        app_params = json.loads(request.META.get(APP_AUTH_HEADER_KEY, "{}"))
+        if not isinstance(app_params, dict):
+            raise AppAuthFailed(gettext("App Auth Params is not Json"))
+        app_code = app_params.get(APP_AUTH_ID_KEY)
+        app_secret = app_params.get(APP_AUTH_SECRET_KEY)
+        if not app_code or not app_secret:
+            raise AppAuthFailed(gettext("App Auth Params Not Exist"))
+        return app_code, app_secret
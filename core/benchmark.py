@@ -0,0 +1,128 @@
+import contextlib
+import math
+import time
+import tracemalloc
+from typing import Callable, Iterator, List, NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+BENCHMARK_HOST = "testserver"
+LOCAL_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"}}
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Benchmark Result
+    latency in ms, queries and alloc (peak KiB traced by tracemalloc) are averaged per call
+    """
+
+    name: str
+    calls: int
+    p50: float
+    p95: float
+    p99: float
+    queries: float
+    alloc: float
+
+
+def percentile(values: List[float], percent: int) -> float:
+    """
+    nearest rank percentile
+    """
+
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(values)) - 1)
+    return values[index]
+
+
+def run_benchmark(name: str, func: Callable[[int], None], iterations: int, warmup: int = 10) -> BenchmarkResult:
+    """
+    call func(index) repeatedly
+    latency and queries are measured without tracemalloc, allocations are measured in another pass
+    """
+
+    # warmup
+    for index in range(warmup):
+        func(index)
+
+    # latency and queries
+    latencies = []
+    queries = 0
+    for index in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            func(index)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries += len(context.captured_queries)
+
+    # allocations
+    alloc_calls = max(1, min(iterations, 50))
+    alloc = 0
+    tracemalloc.start()
+    try:
+        for index in range(alloc_calls):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            func(index)
+            _, peak = tracemalloc.get_traced_memory()
+            alloc += peak - current
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        name=name,
+        calls=iterations,
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        queries=queries / max(1, iterations),
+        alloc=alloc / alloc_calls / 1024,
+    )
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """
+    format results as table
+    """
+
+    lines = [
+        "{:<28}{:>8}{:>10}{:>10}{:>10}{:>10}{:>12}".format(
+            "name", "calls", "p50(ms)", "p95(ms)", "p99(ms)", "queries", "alloc(KiB)"
+        )
+    ]
+    for r in results:
+        lines.append(
+            "{:<28}{:>8}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.1f}{:>12.1f}".format(
+                r.name, r.calls, r.p50, r.p95, r.p99, r.queries, r.alloc
+            )
+        )
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def benchmark_environment(use_redis: bool = False) -> Iterator[None]:
+    """
+    run in a temporary test database with debug middlewares disabled
+    cache is replaced by process local memory unless use_redis, so live redis data will not be touched
+    """
+
+    overrides = {
+        "DEBUG": False,
+        "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, BENCHMARK_HOST],
+        "MIDDLEWARE": [m for m in settings.MIDDLEWARE if not m.startswith("pyinstrument.")],
+    }
+    if not use_redis:
+        overrides["CACHES"] = LOCAL_CACHES
+        overrides["IAM_SNAPSHOT_CACHE_ENABLED"] = False
+        overrides["MODEL_CACHE_LOCAL_ENABLED"] = False
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(**overrides):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,78 @@
+import zlib
+from typing import Iterable, Iterator, Union
+
+
+class Bitmap:
+    """
+    Set of Non-negative Integers stored as Bitmap
+    set algebra runs on python int, dumps as zlib compressed little endian bytes
+    """
+
+    def __init__(self, value: int = 0) -> None:
+        self.value = value
+
+    @classmethod
+    def from_members(cls, members: Iterable[int]) -> "Bitmap":
+        """
+        build bitmap from integers
+        """
+
+        members = list(members)
+        if not members:
+            return cls()
+        buffer = bytearray(max(members) // 8 + 1)
+        for member in members:
+            buffer[member >> 3] |= 1 << (member & 7)
+        return cls(int.from_bytes(buffer, "little"))
+
+    @classmethod
+    def loads(cls, data: Union[bytes, memoryview, None]) -> "Bitmap":
+        """
+        load bitmap from compressed bytes
+        """
+
+        if not data:
+            return cls()
+        return cls(int.from_bytes(zlib.decompress(bytes(data)), "little"))
+
+    def dumps(self) -> bytes:
+        """
+        dump bitmap to compressed bytes
+        """
+
+        return zlib.compress(self.to_bytes())
+
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes((self.value.bit_length() + 7) // 8, "little")
+
+    def __iter__(self) -> Iterator[int]:
+        for (index, byte) in enumerate(self.to_bytes()):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield index * 8 + bit
+
+    def __contains__(self, member: int) -> bool:
+        return member >= 0 and bool(self.value >> member & 1)
+
+    def __len__(self) -> int:
+        return bin(self.value).count("1")
+
+    def __bool__(self) -> bool:
+        return bool(self.value)
+
+    def __eq__(self, other: "Bitmap") -> bool:
+        return isinstance(other, Bitmap) and self.value == other.value
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.value | other.value)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.value & other.value)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.value & ~other.value)
+
+    def __repr__(self) -> str:
+        return f"<Bitmap {len(self)}>"
@@ -1,11 +1,37 @@
-from typing import Union
+import threading
+import time
+from typing import Awaitable, Callable, Iterable, List, NamedTuple, Union
 
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from django.utils.http import parse_etags
 from rest_framework.request import Request
 
+from core.async_cache import async_cache
 from core.constants import DEFAULT_CACHE_TIMEOUT
+from core.model_cache import model_cache
 from core.models import Empty
-from core.utils import get_md5
+from core.renderers import APIRenderer, RenderedData
+from core.single_flight import CacheEnvelope, single_flight
+from core.utils import get_hash
+
+CACHE_REQUEST_DIGEST_KEY = "_cache_request_digest"
+
+
+class CachedData(NamedTuple):
+    """
+    Cached Data with Weak ETag of its Content and Rendered Body
+    """
+
+    etag: str
+    data: Union[list, dict]
+    rendered: RenderedData = None
+
+    @classmethod
+    def build(cls, data: Union[list, dict]) -> "CachedData":
+        return cls(etag=f'W/"{get_hash(data)}"', data=data, rendered=APIRenderer.pre_render(data))
 
 
 class CacheItem:
@@ -13,11 +39,21 @@ class CacheItem:
     cache item
     """
 
-    def __init__(self, name: str, timeout: int, request: Request, user_bind: bool = True, *args, **kwargs) -> None:
+    def __init__(
+        self,
+        name: str,
+        timeout: int,
+        request: Request,
+        user_bind: bool = True,
+        cache_models: Iterable[type] = None,
+        *args,
+        **kwargs,
+    ) -> None:
         self.name = name
         self.timeout = timeout
         self.request = request
         self.user_bind = user_bind
+        self.cache_models = cache_models or []
         self.args = args
         self.kwargs = kwargs
 
@@ -27,7 +63,7 @@ class CacheItem:
             return self.request.user.username
         return ""
 
-    @property
+    @cached_property
     def cache_key(self) -> str:
         """
         cache key
@@ -36,30 +72,61 @@ class CacheItem:
         return "{}:{}:{}".format(
             self.name,
             self.username,
-            get_md5(
-                [
-                    get_md5(self.request.query_params),
-                    get_md5(self.request.data),
-                    get_md5(self.args),
-                    get_md5(self.kwargs),
-                ]
-            ),
+            get_hash(self.request_digest, self.args, self.kwargs, self.generations),
         )
 
+    @property
+    def generations(self) -> List[int]:
+        """
+        generation of models, cache is invalidated when any model saved or deleted
+        """
+
+        if not self.cache_models:
+            return []
+        return model_cache.get_generations(self.cache_models)
+
+    @property
+    def request_digest(self) -> str:
+        """
+        hash of query params and data, memoized on request
+        """
+
+        digest = getattr(self.request, CACHE_REQUEST_DIGEST_KEY, None)
+        if digest is None:
+            digest = get_hash(self.request.query_params, self.request.data)
+            setattr(self.request, CACHE_REQUEST_DIGEST_KEY, digest)
+        return digest
+
     def set_cache(self, data: Union[list, dict]) -> None:
         """
         set cache
         """
 
-        cache.set(self.cache_key, data, timeout=self.timeout)
+        cache.set(
+            self.cache_key, CacheEnvelope(CachedData.build(data), 0, time.time() + self.timeout), timeout=self.timeout
+        )
 
     def get_cache(self) -> (bool, Union[list, dict]):
         """
         get cache
         """
 
-        data = cache.get(self.cache_key, default=Empty())
-        return not isinstance(data, Empty), data
+        data = cache.get(self.cache_key)
+        if isinstance(data, CacheEnvelope):
+            return True, data.value.data
+        return False, Empty()
+
+    def fetch_cache(self, loader: Callable[[], Union[list, dict]]) -> "CachedData":
+        """
+        get cache or load by loader, concurrent misses are loaded once
+        """
+
+        return single_flight.fetch(
+            key=self.cache_key,
+            loader=lambda: (CachedData.build(loader()), self.timeout),
+            get=cache.get,
+            set=cache.set,
+        )
 
 
 class CacheMixin:
@@ -71,6 +138,7 @@ class CacheMixin:
     cache_user_bind = True
     cache_item_class = CacheItem
     cache_timeout = DEFAULT_CACHE_TIMEOUT
+    cache_models = []
 
     def _build_cache_item(self, request: Request, *args, **kwargs) -> CacheItem:
         """
@@ -82,8 +150,9 @@ class CacheMixin:
             timeout=self.cache_timeout,
             request=request,
             user_bind=self.cache_user_bind,
+            cache_models=self.cache_models,
             *args,
-            **kwargs
+            **kwargs,
         )
 
     def get_cache(self, request: Request, *args, **kwargs) -> (bool, Union[list, dict]):
@@ -101,3 +170,142 @@ class CacheMixin:
 
         cache_item = self._build_cache_item(request, *args, **kwargs)
         cache_item.set_cache(data)
+
+    def fetch_cache(self, loader: Callable[[], Union[list, dict]], request: Request, *args, **kwargs) -> CachedData:
+        """
+        get cache or load data and save to cache
+        """
+
+        cache_item = self._build_cache_item(request, *args, **kwargs)
+        return cache_item.fetch_cache(loader)
+
+    def is_not_modified(self, request: Request, etag: str) -> bool:
+        """
+        check if-none-match of safe request, etags are compared weakly
+        """
+
+        if request.method not in ("GET", "HEAD"):
+            return False
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        return "*" in etags or etag.removeprefix("W/") in {e.removeprefix("W/") for e in etags}
+
+
+class LocalCache:
+    """
+    process local cache, all data will be dropped when size exceeded
+    keys not found are cached as None, unless cache_missing is False
+    """
+
+    def __init__(self, max_size: int, cache_missing: bool = True) -> None:
+        self.max_size = max_size
+        self.cache_missing = cache_missing
+        self._version = None
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _sync_version(self) -> any:
+        return self._version
+
+    async def _async_sync_version(self) -> any:
+        return self._version
+
+    def load(self, keys: Iterable, loader: Callable[[list], dict]) -> dict:
+        """
+        get values from local cache, missing keys will be loaded by loader
+        """
+
+        # version should be read before loading, so data loaded under an old version will be dropped
+        version = self._sync_version()
+        result, missing = self._get_local(keys)
+        if missing:
+            self._set_local(version, missing, loader(missing), result)
+        return result
+
+    async def aload(self, keys: Iterable, loader: Callable[[list], Awaitable[dict]]) -> dict:
+        """
+        async load, loader is a coroutine function
+        """
+
+        version = await self._async_sync_version()
+        result, missing = self._get_local(keys)
+        if missing:
+            self._set_local(version, missing, await loader(missing), result)
+        return result
+
+    def _get_local(self, keys: Iterable) -> (dict, list):
+        data = self._data
+        result = {}
+        missing = []
+        for key in keys:
+            if key in data:
+                result[key] = data[key]
+            else:
+                missing.append(key)
+        return result, missing
+
+    def _set_local(self, version: any, missing: list, loaded: dict, result: dict) -> None:
+        # keys not found will be returned as None
+        result.update({key: loaded.get(key) for key in missing})
+        if self.cache_missing:
+            for key in missing:
+                loaded.setdefault(key, None)
+        with self._lock:
+            if version != self._version:
+                return
+            if len(self._data) + len(loaded) > self.max_size:
+                self._data = {}
+            self._data.update(loaded)
+
+
+class VersionedLocalCache(LocalCache):
+    """
+    process local cache, invalidated by a version counter in redis
+    """
+
+    def __init__(self, version_key: str, max_size: int) -> None:
+        super().__init__(max_size)
+        self.version_key = version_key
+
+    def _sync_version(self) -> int:
+        """
+        drop local data if version changed
+        """
+
+        version = cache.get(self.version_key)
+        if version is None:
+            version = self._init_version()
+        return self._apply_version(version)
+
+    async def _async_sync_version(self) -> int:
+        version = await async_cache.get(self.version_key)
+        if version is None:
+            version = await sync_to_async(self._init_version)()
+        return self._apply_version(version)
+
+    def _init_version(self) -> int:
+        """
+        missing version is initialized by current time, so it never goes back after evicted or flushed
+        """
+
+        version = time.time_ns() // 1000
+        cache.add(self.version_key, version, timeout=None)
+        return cache.get(self.version_key, version)
+
+    def _apply_version(self, version: int) -> int:
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._data = {}
+                    self._version = version
+        return version
+
+    def bump_version(self) -> None:
+        """
+        invalidate all process local data after current transaction committed
+        """
+
+        transaction.on_commit(self._incr_version)
+
+    def _incr_version(self) -> None:
+        if not cache.add(self.version_key, time.time_ns() // 1000, timeout=None):
+            cache.incr(self.version_key)
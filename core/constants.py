@@ -17,6 +17,8 @@ MAX_PAGE_SIZE = 100
 
 # Cache
 DEFAULT_CACHE_TIMEOUT = 60
+# for views invalidated by cache_models
+LONG_CACHE_TIMEOUT = 60 * 60 * 24
 
 # App Auth
 APP_AUTH_HEADER_KEY = "HTTP_OVINC_APP"
@@ -0,0 +1,40 @@
+import contextvars
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+execute_wrappers = contextvars.ContextVar("execute_wrappers", default=())
+
+
+def _execute_with_context_wrappers(execute, sql, params, many, context):
+    for wrapper in reversed(execute_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_execute_wrappers(connection, **kwargs) -> None:
+    if _execute_with_context_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_with_context_wrappers)
+
+
+@contextmanager
+def execute_wrapper(wrapper: Callable):
+    """
+    like connection.execute_wrapper, but wraps queries of current context on any connection
+    context is copied to threads of async orm, so their queries are wrapped too
+    """
+
+    # connections of current thread opened before signal connected
+    for connection in connections.all(initialized_only=True):
+        install_execute_wrappers(connection)
+    token = execute_wrappers.set((*execute_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        execute_wrappers.reset(token)
+
+
+connection_created.connect(install_execute_wrappers)
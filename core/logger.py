@@ -2,6 +2,10 @@ import datetime
 import json
 import logging
 import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Union
 
 from django.conf import settings
@@ -66,6 +70,15 @@ def get_logging_config_dict(log_level: str, log_dir: str) -> dict:
                 "backupCount": 5,
                 "encoding": "utf8",
             },
+            "request": {
+                "class": "core.logger.AsyncRotatingFileHandler",
+                "formatter": "verbose",
+                "filename": os.path.join(log_dir, "request.log"),
+                "maxBytes": 1024 * 1024 * 10,
+                "backupCount": 5,
+                "encoding": "utf8",
+                "queue_size": int(os.getenv("REQUEST_LOG_QUEUE_SIZE", "10000")),
+            },
         },
         "loggers": {
             "django": {"handlers": ["null"], "level": "INFO", "propagate": True},
@@ -88,10 +101,63 @@ def get_logging_config_dict(log_level: str, log_dir: str) -> dict:
             "app": {"handlers": ["app"], "level": log_level, "propagate": True},
             "mysql": {"handlers": ["mysql"], "level": log_level, "propagate": True},
             "cel": {"handlers": ["cel"], "level": log_level, "propagate": True},
+            "request": {"handlers": ["request"], "level": log_level, "propagate": False},
         },
     }
 
 
+class AsyncRotatingFileHandler(QueueHandler):
+    """
+    Rotating File Handler Writing in Background Thread
+    records are formatted and written by listener thread, and dropped when the bounded queue is full
+    """
+
+    def __init__(
+        self, filename: str, maxBytes: int = 0, backupCount: int = 0, encoding: str = None, queue_size: int = 10000
+    ) -> None:
+        super().__init__(queue.Queue(queue_size))
+        self.target = RotatingFileHandler(
+            filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding, delay=True
+        )
+        self.queue_size = queue_size
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def setFormatter(self, fmt: logging.Formatter) -> None:
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # format in listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # listener thread does not survive fork, so start it in each process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self.queue = queue.Queue(self.queue_size)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def close(self) -> None:
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
 class DumpLog:
     """
     Dump Log to Str
@@ -145,6 +211,86 @@ class Log:
         return LogLevelHandler(self, level)
 
 
+class LazyDump:
+    """
+    Dump Arg to Str when Formatted, Truncated to Max Length
+    only the head of arg is decoded or encoded, so large body is never dumped entirely
+    """
+
+    encoder = json.JSONEncoder(ensure_ascii=False)
+
+    def __init__(self, arg, max_length: int):
+        self.arg = arg
+        self.max_length = max_length
+
+    def __str__(self) -> str:
+        arg = self.arg
+        if not self.max_length:
+            return str(DumpLog(arg).args[0])
+        if isinstance(arg, (bytes, bytearray)):
+            # utf8 char takes at most 4 bytes, char cut at the end is dropped
+            return self.truncate(bytes(arg[: self.max_length * 4]).decode(errors="ignore"), f"{len(arg)} bytes")
+        if isinstance(arg, str):
+            return self.truncate(arg, f"{len(arg)} chars")
+        if not isinstance(arg, (dict, list, tuple)):
+            return self.truncate(str(DumpLog(arg).args[0]))
+        # encode in chunks until max length exceeded
+        chunks = []
+        length = 0
+        try:
+            for chunk in self.encoder.iterencode(arg):
+                chunks.append(chunk)
+                length += len(chunk)
+                if length > self.max_length:
+                    return self.truncate("".join(chunks))
+        except Exception:
+            return self.truncate(force_str(arg))
+        return "".join(chunks)
+
+    def truncate(self, value: str, total: str = "truncated") -> str:
+        if len(value) > self.max_length:
+            return f"{value[:self.max_length]}...({total})"
+        return value
+
+
+class LazyLogLevelHandler(LogLevelHandler):
+    """
+    Handler Log Level, Args are Dumped by Handler
+    """
+
+    def __call__(self, msg, *args):
+        args = tuple(LazyDump(arg, self.log.max_length) for arg in args)
+        func = getattr(self.log.logger, self.level)
+        func(msg, *args)
+
+
+class RequestLog(Log):
+    """
+    Request Log
+    args are dumped and truncated lazily, requests are sampled by path prefix
+    """
+
+    @property
+    def max_length(self) -> int:
+        return settings.REQUEST_LOG_MAX_LENGTH
+
+    def __getattr__(self, level: str):
+        return LazyLogLevelHandler(self, level)
+
+    def is_sampled(self, path: str) -> bool:
+        """
+        check if request should be logged, rate of the longest matched prefix is used
+        """
+
+        rate = settings.REQUEST_LOG_SAMPLE_RATE
+        matched = ""
+        for (prefix, prefix_rate) in settings.REQUEST_LOG_SAMPLE_RATES.items():
+            if path.startswith(prefix) and len(prefix) > len(matched):
+                matched, rate = prefix, prefix_rate
+        return rate >= 1 or random.random() < rate
+
+
 logger = Log("app")
 celery_logger = Log("cel")
 mysql_logger = Log("mysql")
+request_logger = RequestLog("request")
@@ -0,0 +1,227 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.asyncio.client import Pipeline as AsyncPipeline
+from redis.asyncio.client import Redis as AsyncRedis
+from redis.client import Pipeline, Redis
+
+from core.db import execute_wrapper
+from core.logger import logger
+
+# fixed log-linear buckets (upper bounds), the last bucket is +Inf
+METRIC_BUCKETS = {
+    "latency_ms": [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000],
+    "sql_queries": [0, 1, 2, 3, 5, 10, 20, 50, 100],
+    "redis_ops": [0, 1, 2, 3, 5, 10, 20, 50, 100],
+    "response_bytes": [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304],
+}
+METRIC_HELP = {
+    "latency_ms": "Request latency in milliseconds",
+    "sql_queries": "SQL queries per request",
+    "redis_ops": "Redis commands per request",
+    "response_bytes": "Response body size in bytes",
+}
+
+redis_ops_counter = contextvars.ContextVar("redis_ops_counter", default=None)
+
+
+def count_redis_ops(count: int) -> None:
+    """
+    add commands to redis_ops_counter of current context
+    """
+
+    counter = redis_ops_counter.get()
+    if counter is not None:
+        counter[0] += count
+
+
+class CountedPipeline(Pipeline):
+    """
+    Pipeline Counting Buffered Commands
+    """
+
+    def execute(self, *args, **kwargs):
+        count_redis_ops(len(self.command_stack))
+        return super().execute(*args, **kwargs)
+
+
+class CountedRedis(Redis):
+    """
+    Redis Client Counting Commands
+    used as REDIS_CLIENT_CLASS of django-redis, so commands of cache and get_redis_connection are counted
+    """
+
+    def execute_command(self, *args, **options):
+        count_redis_ops(1)
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str = None) -> CountedPipeline:
+        return CountedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class AsyncCountedPipeline(AsyncPipeline):
+    """
+    Async Pipeline Counting Buffered Commands
+    """
+
+    async def execute(self, *args, **kwargs):
+        count_redis_ops(len(self.command_stack))
+        return await super().execute(*args, **kwargs)
+
+
+class AsyncCountedRedis(AsyncRedis):
+    """
+    Async Redis Client Counting Commands
+    """
+
+    async def execute_command(self, *args, **options):
+        count_redis_ops(1)
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str = None) -> AsyncCountedPipeline:
+        return AsyncCountedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class RequestCounter:
+    """
+    Count Latency, SQL Queries and Redis Commands of One Request
+    counters are bound to context, so queries and commands of async request in threads are counted
+    """
+
+    def __init__(self) -> None:
+        self.sql_queries = 0
+        self._redis_ops = [0]
+        self._start = None
+        self._end = None
+        self._stack = ExitStack()
+
+    @property
+    def redis_ops(self) -> int:
+        return self._redis_ops[0]
+
+    @property
+    def latency_ms(self) -> float:
+        return ((self._end or time.perf_counter()) - self._start) * 1000
+
+    def count_sql(self, execute, sql, params, many, context):
+        self.sql_queries += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self) -> "RequestCounter":
+        self._stack.enter_context(execute_wrapper(self.count_sql))
+        token = redis_ops_counter.set(self._redis_ops)
+        self._stack.callback(redis_ops_counter.reset, token)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._end = time.perf_counter()
+        self._stack.close()
+
+
+class MetricsRecorder:
+    """
+    Per View Histograms Shared by Workers
+    observations are aggregated in process and flushed to redis hashes by a background thread
+    hash field is "{view}|{method}|{bucket index}", with "sum" and "count" in place of bucket index
+    """
+
+    key = "metrics:{name}"
+
+    def __init__(self) -> None:
+        self._pid = None
+        self._data = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, view: str, method: str, values: Dict[str, float]) -> None:
+        # flush thread does not survive fork, so start it in each process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        with self._lock:
+            for (name, value) in values.items():
+                index = bisect.bisect_left(METRIC_BUCKETS[name], value)
+                self._data[(name, f"{view}|{method}|{index}")] += 1
+                self._data[(name, f"{view}|{method}|sum")] += value
+                self._data[(name, f"{view}|{method}|count")] += 1
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._data = defaultdict(int)
+        thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+        thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            with self._lock:
+                data, self._data = self._data, defaultdict(int)
+            if not data:
+                continue
+            try:
+                pipeline = get_redis_connection().pipeline(transaction=False)
+                for ((name, field), value) in data.items():
+                    if isinstance(value, float):
+                        pipeline.hincrbyfloat(self.key.format(name=name), field, value)
+                    else:
+                        pipeline.hincrby(self.key.format(name=name), field, value)
+                pipeline.execute()
+            except Exception as err:
+                logger.error("[MetricsFlushFailed] Fields => %s; Error => %s", len(data), err)
+
+    def load(self) -> Dict[str, Dict[Tuple[str, str], Dict[str, float]]]:
+        """
+        load histograms of all workers, {name: {(view, method): {bucket index or sum or count: value}}}
+        """
+
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        for name in METRIC_BUCKETS:
+            pipeline.hgetall(self.key.format(name=name))
+        metrics = {}
+        for (name, fields) in zip(METRIC_BUCKETS, pipeline.execute()):
+            series = metrics[name] = defaultdict(dict)
+            for (field, value) in fields.items():
+                (view, method, bucket) = field.decode().rsplit("|", 2)
+                series[(view, method)][bucket] = float(value)
+        return metrics
+
+    def render(self) -> str:
+        """
+        render histograms in prometheus text format
+        """
+
+        lines: List[str] = []
+        for (name, series) in self.load().items():
+            metric = f"{settings.METRICS_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+            bounds = [*(str(bound) for bound in METRIC_BUCKETS[name]), "+Inf"]
+            for ((view, method), buckets) in sorted(series.items()):
+                labels = f'view="{self.escape(view)}",method="{self.escape(method)}"'
+                cumulative = 0
+                for (index, bound) in enumerate(bounds):
+                    cumulative += buckets.get(str(index), 0)
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {self.format_value(cumulative)}')
+                lines.append(f"{metric}_sum{{{labels}}} {self.format_value(buckets.get('sum', 0))}")
+                lines.append(f"{metric}_count{{{labels}}} {self.format_value(buckets.get('count', 0))}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def format_value(value: float) -> str:
+        return str(int(value)) if value == int(value) else repr(value)
+
+    @staticmethod
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics_recorder = MetricsRecorder()
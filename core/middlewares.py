@@ -1,13 +1,18 @@
+import random
+import time
 import traceback
 from functools import wraps
 
 from django.conf import settings
-from django.db import connection
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from core.access_log import AccessLogRecord, access_log_writer
+from core.db import execute_wrapper
 from core.exceptions import ServerError, exception_handler
-from core.logger import logger, mysql_logger
+from core.logger import logger
+from core.metrics import RequestCounter, metrics_recorder
+from core.sql_profiler import SQLProfile, sql_profiler
 
 
 class CSRFExemptMiddleware(MiddlewareMixin):
@@ -28,35 +33,40 @@ class CSRFExemptMiddleware(MiddlewareMixin):
         return None
 
 
-class SQLDebugMiddleware(MiddlewareMixin):
+class SQLProfilerMiddleware(MiddlewareMixin):
     """
-    SQL Debug
+    Profile SQL of Sampled Requests
     """
 
-    def process_response(self, request, response: JsonResponse) -> JsonResponse:
-        if not settings.DEBUG:
-            return response
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+        profile = SQLProfile()
+        with execute_wrapper(profile):
+            response = self.get_response(request)
+        self.record(profile)
+        return response
 
-        cursor = connection.cursor()
-        for sql in connection.queries:
-            sql_str = sql.get("sql")
-            sql_time = sql.get("time")
-            if sql_str.startswith("SET"):
-                continue
-            try:
-                cursor.execute(f"explain {sql_str}")
-                explain_data = cursor.fetchall()
-            except Exception:
-                explain_data = []
-            # [2] is table，skip table
-            if not explain_data or explain_data[0][2] is None:
-                continue
-            msg = "[{}] {}".format(sql_time, sql_str)
-            for i in explain_data:
-                msg += "\n \t [{}][{}] {}".format(i[4], i[6], i)
-            mysql_logger.info(msg)
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+        profile = SQLProfile()
+        with execute_wrapper(profile):
+            response = await self.get_response(request)
+        self.record(profile)
         return response
 
+    def is_sampled(self) -> bool:
+        return settings.SQL_PROFILER_ENABLED and random.random() < settings.SQL_PROFILER_SAMPLE_RATE
+
+    def record(self, profile: SQLProfile) -> None:
+        try:
+            sql_profiler.record(profile)
+        except Exception:
+            logger.error("[SQLProfileFailed] %s", traceback.format_exc())
+
 
 class UnHandleExceptionMiddleware(MiddlewareMixin):
     """
@@ -67,3 +77,78 @@ class UnHandleExceptionMiddleware(MiddlewareMixin):
         msg = traceback.format_exc()
         logger.error("[unhandled exception] %s\n%s", str(exception), msg)
         return exception_handler(ServerError(), {})
+
+
+class AccessLogMiddleware(MiddlewareMixin):
+    """
+    Structured Access Log
+    """
+
+    def process_request(self, request) -> None:
+        setattr(request, "_access_log_start", time.perf_counter())
+        return None
+
+    def process_response(self, request, response):
+        if not settings.ACCESS_LOG_ENABLED or not hasattr(request, "_access_log_start"):
+            return response
+        try:
+            access_log_writer.write(self.build_record(request, response))
+        except Exception:
+            logger.error("[AccessLogFailed] %s", traceback.format_exc())
+        return response
+
+    def build_record(self, request, response) -> AccessLogRecord:
+        user = getattr(request, "user", None)
+        resolver_match = getattr(request, "resolver_match", None)
+        return AccessLogRecord(
+            timestamp=time.time(),
+            user=getattr(user, "username", None) or getattr(user, "app_code", None) or "",
+            method=request.method,
+            path=request.path,
+            route=resolver_match.route.lstrip("^").rstrip("$") if resolver_match else "",
+            status=response.status_code,
+            latency=round((time.perf_counter() - request._access_log_start) * 1000, 3),
+            request_size=int(request.META.get("CONTENT_LENGTH") or 0),
+            response_size=0 if response.streaming else len(response.content),
+            trace_id=getattr(request, "otel_trace_id", None) or "",
+        )
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Record Latency, SQL Queries, Redis Commands and Response Size of Each View
+    """
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        with RequestCounter() as counter:
+            response = self.get_response(request)
+        self.observe(request, response, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        with RequestCounter() as counter:
+            response = await self.get_response(request)
+        self.observe(request, response, counter)
+        return response
+
+    def observe(self, request, response, counter: RequestCounter) -> None:
+        try:
+            resolver_match = getattr(request, "resolver_match", None)
+            metrics_recorder.observe(
+                view=resolver_match.route.lstrip("^").rstrip("$") if resolver_match else "unmatched",
+                method=request.method,
+                values={
+                    "latency_ms": counter.latency_ms,
+                    "sql_queries": counter.sql_queries,
+                    "redis_ops": counter.redis_ops,
+                    "response_bytes": 0 if response.streaming else len(response.content),
+                },
+            )
+        except Exception:
+            logger.error("[MetricsFailed] %s", traceback.format_exc())
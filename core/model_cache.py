@@ -0,0 +1,294 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django_redis import get_redis_connection
+
+from core.async_cache import async_cache
+from core.logger import logger
+
+
+class LRUCache:
+    """
+    Process Local LRU Cache
+    bounded by count and total bytes of entries, value is bytes and expires after timeout
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, timeout: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, timeout: float = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._bytes += len(value)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data = OrderedDict()
+            self._bytes = 0
+
+    def _pop(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[1])
+
+
+class ModelCache:
+    """
+    Two Tier Cache for Model Instance
+    process local lru in front of redis, local entries are dropped by invalidation messages from redis pub/sub
+    local entries expire no later than redis entries, local tier is bypassed when subscription is not available
+    """
+
+    channel = "model-cache-invalidate"
+    generation_key = "model-generation:{label}"
+    reconnect_interval = 1
+
+    def __init__(self) -> None:
+        self._pid = None
+        self._local = None
+        self._listening = False
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def local(self) -> Optional[LRUCache]:
+        if not settings.MODEL_CACHE_LOCAL_ENABLED:
+            return None
+        # subscriber thread does not survive fork, so start it in each process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        return self._local if self._listening else None
+
+    def get(self, key: str) -> any:
+        local = self.local
+        if local is None:
+            return cache.get(key)
+
+        # local
+        value = local.get(key)
+        if value is not None:
+            return pickle.loads(value)
+
+        # redis, skip saving to local if invalidated while loading
+        epoch = self._epoch
+        instance, timeout = self._get_with_ttl(key)
+        if instance is not None and epoch == self._epoch:
+            self._set_local(local, key, instance, timeout)
+        return instance
+
+    async def alocal(self) -> Optional[LRUCache]:
+        """
+        local tier in event loop, subscribing to redis blocks so it is started in thread
+        """
+
+        if settings.MODEL_CACHE_LOCAL_ENABLED and self._pid != os.getpid():
+            return await sync_to_async(lambda: self.local)()
+        return self.local
+
+    async def aget(self, key: str) -> any:
+        local = await self.alocal()
+        if local is None:
+            return await async_cache.get(key)
+
+        # local
+        value = local.get(key)
+        if value is not None:
+            return pickle.loads(value)
+
+        # redis, skip saving to local if invalidated while loading
+        epoch = self._epoch
+        instance, timeout = await async_cache.get_with_ttl(key)
+        if instance is not None and epoch == self._epoch:
+            self._set_local(local, key, instance, timeout)
+        return instance
+
+    def _get_with_ttl(self, key: str) -> Tuple[any, Optional[float]]:
+        """
+        value and remaining timeout (seconds) of key in one round trip, timeout is None if key never expires
+        """
+
+        redis_key = cache.make_key(key)
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        pipeline.get(redis_key)
+        pipeline.pttl(redis_key)
+        value, pttl = pipeline.execute()
+        if value is None:
+            return None, None
+        return cache.client.decode(value), (pttl / 1000 if pttl >= 0 else None)
+
+    def _set_local(self, local: LRUCache, key: str, instance: any, timeout: Optional[float]) -> None:
+        # local entry should not outlive redis entry
+        if timeout is not None and timeout <= 0:
+            return
+        local.set(key, pickle.dumps(instance, pickle.HIGHEST_PROTOCOL), timeout)
+
+    def set(self, key: str, instance: any, timeout: int) -> None:
+        cache.set(key, instance, timeout)
+        local = self.local
+        if local is not None:
+            local.set(key, pickle.dumps(instance, pickle.HIGHEST_PROTOCOL), timeout)
+
+    def delete(self, key: str) -> None:
+        cache.delete(key)
+        if not settings.MODEL_CACHE_LOCAL_ENABLED:
+            return
+        # publish even if local tier of current process is bypassed, other processes may hold the key
+        local = self.local
+        if local is not None:
+            local.delete(key)
+        try:
+            get_redis_connection().publish(self.channel, key)
+        except Exception:
+            logger.error("[ModelCachePublishFailed] Key => %s; Error => %s", key, traceback.format_exc())
+
+    def get_generations(self, models: Iterable[type]) -> List[int]:
+        """
+        generation counters of models, missing counter is initialized by current time so it never goes back
+        """
+
+        keys = [self.generation_key.format(label=model._meta.label) for model in models]
+        generations = cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                cache.add(key, time.time_ns() // 1000, timeout=None)
+                generations[key] = cache.get(key)
+        return [generations[key] for key in keys]
+
+    def bump_generation(self, model: type) -> None:
+        """
+        bump generation counter of model after current transaction committed
+        """
+
+        key = self.generation_key.format(label=model._meta.label)
+        transaction.on_commit(lambda: self._incr_generation(key))
+
+    def _incr_generation(self, key: str) -> None:
+        if not cache.add(key, time.time_ns() // 1000, timeout=None):
+            cache.incr(key)
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._local = LRUCache(
+            settings.MODEL_CACHE_LOCAL_MAX_ENTRIES,
+            settings.MODEL_CACHE_LOCAL_MAX_BYTES,
+            settings.MODEL_CACHE_LOCAL_TIMEOUT,
+        )
+        pubsub = self._subscribe()
+        if pubsub is None:
+            return
+        thread = threading.Thread(target=self._listen, args=(pubsub,), name="model-cache-listener", daemon=True)
+        thread.start()
+
+    def _subscribe(self):
+        try:
+            pubsub = get_redis_connection().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.channel)
+        except Exception:
+            logger.error("[ModelCacheSubscribeFailed] Error => %s", traceback.format_exc())
+            return None
+        self._listening = True
+        return pubsub
+
+    def _listen(self, pubsub) -> None:
+        while True:
+            try:
+                for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    key = message["data"]
+                    self._epoch += 1
+                    self._local.delete(key.decode() if isinstance(key, bytes) else key)
+            except Exception:
+                logger.error("[ModelCacheListenFailed] Error => %s", traceback.format_exc())
+            # messages may be lost while disconnected, local tier is bypassed and cleared until subscribed again
+            self._listening = False
+            self._epoch += 1
+            self._local.clear()
+            pubsub = None
+            while pubsub is None:
+                time.sleep(self.reconnect_interval)
+                pubsub = self._subscribe()
+
+
+class StaleSchema(Exception):
+    """
+    Encoded by Another Schema Version
+    """
+
+
+class ModelCodec:
+    """
+    Encode Model Instance as Tuple of Concrete Field Values
+    state, relation cache and prefetched objects are not kept, instance is rebuilt by Model.from_db
+    """
+
+    def __init__(self) -> None:
+        self._versions = {}
+
+    def schema_version(self, model: type) -> str:
+        """
+        hash of model label and concrete fields, changes when fields are migrated
+        """
+
+        version = self._versions.get(model)
+        if version is None:
+            schema = [model._meta.label] + [
+                f"{field.attname}:{field.get_internal_type()}" for field in model._meta.concrete_fields
+            ]
+            version = self._versions[model] = hashlib.blake2b("|".join(schema).encode(), digest_size=4).hexdigest()
+        return version
+
+    def encode(self, instance: models.Model) -> Tuple[str, tuple]:
+        model = instance.__class__
+        return self.schema_version(model), tuple(
+            getattr(instance, field.attname) for field in model._meta.concrete_fields
+        )
+
+    def decode(self, model: type, data: Tuple[str, tuple]) -> models.Model:
+        version, values = data
+        if version != self.schema_version(model):
+            raise StaleSchema(version)
+        return model.from_db(None, [field.attname for field in model._meta.concrete_fields], values)
+
+
+model_cache = ModelCache()
+model_codec = ModelCodec()
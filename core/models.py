@@ -1,5 +1,5 @@
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.cache import cache
 from django.db import models
 from django.db.models import CharField
 from django.db.models import ForeignKey as _ForeignKey
@@ -10,8 +10,12 @@ from django.db.models import TextChoices as _TextChoices
 from django.utils.translation import gettext_lazy
 from rest_framework.request import Request as _Request
 
+from core.model_cache import StaleSchema, model_cache, model_codec
+from core.single_flight import CacheEnvelope, single_flight
 from core.utils import uniq_id_without_time
 
+MODEL_CACHE_MISSING = "__model_cache_missing__"
+
 
 class Empty:
     ...
@@ -111,18 +115,45 @@ class BaseModelManager(models.Manager):
     def get_cache_instance(self, pk: str) -> "models.Model":
         """
         get cached instance or create cached instance
+        missing pk is cached as a placeholder for a short time, concurrent misses are loaded once
         """
 
-        # get cache first
-        cache_key = self.model.cache_key(pk)
-        instance = cache.get(cache_key)
-        if instance:
-            return instance
+        data = single_flight.fetch(
+            key=self.model.cache_key(pk),
+            loader=lambda: self._load_cache_instance(pk),
+            get=model_cache.get,
+            set=model_cache.set,
+        )
+        try:
+            return self._decode_cache_instance(data)
+        except StaleSchema:
+            # written by a process running another schema
+            return self.get(pk=pk)
+
+    async def aget_cache_instance(self, pk: str) -> "models.Model":
+        """
+        get cached instance in event loop
+        miss, early refresh and stale schema are handled by get_cache_instance in thread, so loads are still coalesced
+        """
+
+        envelope = await model_cache.aget(self.model.cache_key(pk))
+        if isinstance(envelope, CacheEnvelope) and not envelope.should_refresh():
+            try:
+                return self._decode_cache_instance(envelope.value)
+            except StaleSchema:
+                pass
+        return await sync_to_async(self.get_cache_instance)(pk)
+
+    def _decode_cache_instance(self, data: any) -> "models.Model":
+        if data == MODEL_CACHE_MISSING:
+            raise self.model.DoesNotExist
+        return model_codec.decode(self.model, data)
 
-        # create cache if not exist
-        instance = self.get(pk=pk)
-        cache.set(cache_key, instance, self.model.cache_timeout)
-        return self.get_cache_instance(instance)
+    def _load_cache_instance(self, pk: str) -> (tuple, int):
+        try:
+            return model_codec.encode(self.get(pk=pk)), self.model.cache_timeout
+        except self.model.DoesNotExist:
+            return MODEL_CACHE_MISSING, settings.MODEL_CACHE_MISSING_TIMEOUT
 
 
 class BaseModel(models.Model):
@@ -157,10 +188,11 @@ class BaseModel(models.Model):
 
     @classmethod
     def cache_key(cls, pk: str) -> str:
-        return f"model-cache:{cls.__name__}:{pk}"
+        return f"model-cache:{cls.__name__}:{model_codec.schema_version(cls)}:{pk}"
 
     def remove_cache(self) -> None:
-        cache.delete(self.cache_key(self.pk))
+        model_cache.delete(self.cache_key(self.pk))
+        model_cache.bump_generation(self.__class__)
 
 
 class SoftDeletedManager(BaseModelManager):
@@ -1,6 +1,12 @@
+import base64
+import json
 from collections import OrderedDict
+from typing import List, Union
 
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Model, Q, QuerySet
 from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
@@ -28,3 +34,98 @@ class NumPagination(PageNumberPagination):
                 ]
             )
         )
+
+
+class KeysetPagination(NumPagination):
+    """
+    Keyset Pagination
+    seek by opaque cursor on ordering of queryset when cursor param is given, otherwise paginate by page number
+    ordering fields should be concrete and not null, pk is appended as tie breaker
+    """
+
+    cursor_query_param = "cursor"
+    with_total_query_param = "with_total"
+    invalid_cursor_message = gettext_lazy("Invalid Cursor")
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> Union[list, None]:
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        # init
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.cursor = request.query_params[self.cursor_query_param] or None
+
+        # total
+        self.total = None
+        if request.query_params.get(self.with_total_query_param, "true").lower() not in ["false", "0"]:
+            self.total = queryset.count()
+
+        # seek
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor:
+            queryset = queryset.filter(self.get_seek_filter(queryset.model, self.decode_cursor(self.cursor)))
+        page = list(queryset[: page_size + 1])
+
+        # next cursor
+        self.next_cursor = self.encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+        return page[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("total", self.total),
+                    ("current", self.cursor),
+                    ("next", self.next_cursor),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_ordering(self, queryset: QuerySet) -> List[str]:
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        field_names = [field.lstrip("-") for field in ordering]
+        if "pk" not in field_names and queryset.model._meta.pk.name not in field_names:
+            ordering.append("-pk" if ordering and ordering[-1].startswith("-") else "pk")
+        return ordering
+
+    def get_field(self, model: Model, field_name: str):
+        if field_name == "pk":
+            return model._meta.pk
+        return model._meta.get_field(field_name)
+
+    def encode_cursor(self, obj: Model) -> str:
+        values = [self.get_field(obj, field.lstrip("-")).value_to_string(obj) for field in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> list:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_seek_filter(self, model: Model, values: list) -> Q:
+        """
+        rows after cursor: (f1 > v1) or (f1 = v1 and f2 > v2) or ..., lt for descending fields
+        """
+
+        seek_filter = Q()
+        equal_filter = Q()
+        for (field, value) in zip(self.ordering, values):
+            field_name = field.lstrip("-")
+            try:
+                value = self.get_field(model, field_name).to_python(value)
+            except (FieldDoesNotExist, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            lookup = "lt" if field.startswith("-") else "gt"
+            seek_filter |= equal_filter & Q(**{f"{field_name}__{lookup}": value})
+            equal_filter &= Q(**{field_name: value})
+        return seek_filter
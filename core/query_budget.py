@@ -0,0 +1,144 @@
+import os
+import sys
+from contextlib import contextmanager
+from typing import List, Tuple, Union
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.manager import BaseManager
+from rest_framework.request import Request
+from rest_framework.serializers import Serializer
+
+from core.db import execute_wrapper
+from core.logger import logger
+from core.sql_profiler import fingerprint
+
+DB_BACKEND_UTILS = os.path.join("django", "db", "backends", "utils.py")
+# packages of project code, frames of installed or vendored packages inside BASE_DIR are skipped
+PROJECT_PACKAGES = ("apps", "core")
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised in strict mode when queries of one action exceed its budget
+    """
+
+
+def query_budget(max_queries: int):
+    """
+    declare max queries of view set action, such as list or update
+    """
+
+    def decorator(func):
+        func.query_budget = max_queries
+        return func
+
+    return decorator
+
+
+def locate_query() -> str:
+    """
+    serializer field and project code running current query
+    """
+
+    field = code = None
+    project_dirs = tuple(os.path.join(settings.BASE_DIR, package, "") for package in PROJECT_PACKAGES)
+    frame = sys._getframe(1)
+    # skip execute wrappers, which are called inside django db backends
+    while frame is not None and not frame.f_code.co_filename.endswith(DB_BACKEND_UTILS):
+        frame = frame.f_back
+    while frame is not None and (field is None or code is None):
+        if field is None and frame.f_code.co_name == "to_representation":
+            serializer = frame.f_locals.get("self")
+            serializer_field = frame.f_locals.get("field")
+            if isinstance(serializer, Serializer) and serializer_field is not None:
+                field = f"{serializer.__class__.__name__}.{serializer_field.field_name}"
+        filename = frame.f_code.co_filename
+        # managers and querysets of project models wrap orm methods, their callers are reported
+        in_orm = isinstance(frame.f_locals.get("self"), (BaseManager, QuerySet))
+        if code is None and filename.startswith(project_dirs) and not in_orm:
+            code = f"{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return f"{field or '-'} at {code or '-'}"
+
+
+class QueryCounter:
+    """
+    Count Queries of One Request
+    the first repeat of each fingerprint is located
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        # {fingerprint: [count, location]}
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        statement = fingerprint(sql)
+        stat = self.statements.get(statement)
+        if stat is None:
+            self.statements[statement] = [1, None]
+        else:
+            stat[0] += 1
+            if stat[1] is None:
+                stat[1] = locate_query()
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int, str]]:
+        """
+        statements repeated at least threshold times, usually n+1
+        """
+
+        return sorted(
+            [
+                (statement, count, location)
+                for (statement, (count, location)) in self.statements.items()
+                if count >= threshold
+            ],
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+class QueryBudgetMixin:
+    """
+    query budget mixin for view set
+    budget is declared by view set attribute, action kwargs or query_budget decorator
+    """
+
+    query_budget = None
+
+    def get_query_budget(self) -> Union[int, None]:
+        handler = getattr(self, self.action, None) if getattr(self, "action", None) else None
+        return getattr(handler, "query_budget", self.query_budget)
+
+    @contextmanager
+    def check_query_budget(self, request: Request):
+        """
+        count queries in context, log or raise when exceeded
+        """
+
+        budget = self.get_query_budget()
+        if not settings.QUERY_BUDGET_ENABLED or budget is None:
+            yield
+            return
+
+        counter = QueryCounter()
+        with execute_wrapper(counter):
+            yield
+        if counter.count <= budget:
+            return
+
+        repeated = counter.repeated(settings.QUERY_BUDGET_REPEAT_THRESHOLD)
+        msg = "[QueryBudgetExceeded] View => %s; Path => %s:%s; Budget => %s; Queries => %s; Repeated => %s" % (
+            f"{self.__class__.__name__}.{self.action}",
+            request.method,
+            request.path,
+            budget,
+            counter.count,
+            "; ".join(f"{count}x {location}: {statement}" for (statement, count, location) in repeated) or "-",
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(msg)
+        logger.warning(msg)
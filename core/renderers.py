@@ -1,9 +1,86 @@
+import datetime
 import json
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework.renderers import BaseRenderer
-from rest_framework.settings import api_settings
+from rest_framework.settings import ISO_8601, api_settings
 from rest_framework.utils import encoders
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class APIJSONEncoder(encoders.JSONEncoder):
+    """
+    JSON Encoder
+    datetime is formatted by DATETIME_FORMAT of rest_framework
+    """
+
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime) and api_settings.DATETIME_FORMAT not in (None, ISO_8601):
+            return obj.strftime(api_settings.DATETIME_FORMAT)
+        return super().default(obj)
+
+
+class JSONEngine:
+    """
+    Stdlib JSON Engine
+    """
+
+    encoder_class = APIJSONEncoder
+
+    def dumps(self, data: any, ensure_ascii: bool) -> bytes:
+        return json.dumps(data, cls=self.encoder_class, ensure_ascii=ensure_ascii).encode()
+
+
+class ORJSONEngine(JSONEngine):
+    """
+    orjson Engine
+    types not supported by orjson, such as lazy string and decimal, are converted by encoder
+    falls back to stdlib when orjson is not installed, ascii is ensured or data can not be encoded by orjson
+    """
+
+    def __init__(self) -> None:
+        self.encoder = self.encoder_class()
+        self.option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, data: any, ensure_ascii: bool) -> bytes:
+        if orjson is None or ensure_ascii:
+            return super().dumps(data, ensure_ascii)
+        try:
+            return orjson.dumps(data, default=self.encoder.default, option=self.option)
+        except orjson.JSONEncodeError:
+            return super().dumps(data, ensure_ascii)
+
+
+JSON_ENGINES = {"json": JSONEngine(), "orjson": ORJSONEngine()}
+
+# fail when loaded instead of on every render
+if settings.JSON_RENDERER_ENGINE not in JSON_ENGINES:
+    raise ImproperlyConfigured(
+        f"JSON_RENDERER_ENGINE should be one of {', '.join(JSON_ENGINES)}, got {settings.JSON_RENDERER_ENGINE!r}"
+    )
+
+
+class RenderedData:
+    """
+    Rendered Message and Data of Restful Body
+    trace is spliced in when rendering, so it can be cached and shared by requests
+    """
+
+    def __init__(self, message: bytes, data: bytes) -> None:
+        self.message = message
+        self.data = data
+
+    def render(self, trace: str) -> bytes:
+        return b'{"message": %b, "data": %b, "trace": %b}' % (self.message, self.data, json.dumps(trace).encode())
+
+    def __str__(self) -> str:
+        return self.data.decode()
+
 
 class APIRenderer(BaseRenderer):
     """
@@ -15,20 +92,27 @@ class APIRenderer(BaseRenderer):
     encoder_class = encoders.JSONEncoder
     ensure_ascii = not api_settings.UNICODE_JSON
 
-    def render(self, data, accepted_media_type=None, renderer_context=None) -> str:
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
         request = renderer_context.get("request")
-        response = {
-            "message": "success",
-            "data": None,
-            "trace": getattr(request, "otel_trace_id"),
-        }
+        if not isinstance(data, RenderedData):
+            data = self.pre_render(data)
+        return data.render(getattr(request, "otel_trace_id", None))
+
+    @classmethod
+    def pre_render(cls, data) -> RenderedData:
+        """
+        render message and data without trace
+        """
+
+        message = "success"
         if isinstance(data, dict):
             if "message" in data:
-                response["message"] = data.pop("message")
+                message = data["message"]
+                data = {key: value for (key, value) in data.items() if key != "message"}
             if "data" in data:
-                response["data"] = data["data"]
-            else:
-                response["data"] = data
-        else:
-            response["data"] = data
-        return json.dumps(response, ensure_ascii=self.ensure_ascii)
+                data = data["data"]
+        engine = JSON_ENGINES[settings.JSON_RENDERER_ENGINE]
+        return RenderedData(
+            message=engine.dumps(message, cls.ensure_ascii),
+            data=engine.dumps(data, cls.ensure_ascii),
+        )
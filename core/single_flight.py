@@ -0,0 +1,125 @@
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, NamedTuple, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.logger import logger
+
+
+class CacheEnvelope(NamedTuple):
+    """
+    Cached Value with Recompute Cost (seconds) and Expire Time (unix timestamp)
+    """
+
+    value: any
+    delta: float
+    expire_at: float
+
+    def should_refresh(self) -> bool:
+        """
+        xfetch, refresh early with a probability growing as expire time and recompute cost approach
+        """
+
+        return time.time() - self.delta * settings.CACHE_XFETCH_BETA * math.log(1 - random.random()) >= self.expire_at
+
+
+class SingleFlight:
+    """
+    Coalesce Concurrent Loads of the Same Key
+    threads in a process share one in-flight future, processes share one redis lease (SET NX)
+    """
+
+    lease_key = "cache-lease:{key}"
+
+    def __init__(self) -> None:
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def fetch(
+        self,
+        key: str,
+        loader: Callable[[], Tuple[any, int]],
+        get: Callable[[str], any],
+        set: Callable[[str, any, int], None],
+    ) -> any:
+        """
+        read through cache
+        loader returns value and timeout, get and set access the cache storing envelope
+        """
+
+        # cache
+        envelope = get(key)
+        if isinstance(envelope, CacheEnvelope):
+            if not envelope.should_refresh():
+                return envelope.value
+            stale = envelope
+        else:
+            stale = None
+
+        # join in-flight load in process
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if not owner:
+            if stale is not None:
+                return stale.value
+            try:
+                value = future.result(timeout=settings.CACHE_LEASE_TIMEOUT)
+            except FutureTimeoutError:
+                return self._load(key, loader, set)
+            # read again so that each caller gets its own copy
+            envelope = get(key)
+            return envelope.value if isinstance(envelope, CacheEnvelope) else value
+
+        # load
+        try:
+            value = self._fetch(key, loader, get, set, stale)
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+        return value
+
+    def _fetch(self, key: str, loader: Callable, get: Callable, set: Callable, stale: CacheEnvelope) -> any:
+        lease_key = self.lease_key.format(key=key)
+        if cache.add(lease_key, 1, settings.CACHE_LEASE_TIMEOUT):
+            try:
+                return self._load(key, loader, set)
+            finally:
+                cache.delete(lease_key)
+
+        # another process is loading, serve stale value or wait for it
+        if stale is not None:
+            return stale.value
+        deadline = time.monotonic() + settings.CACHE_LEASE_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LEASE_WAIT_INTERVAL)
+            envelope = get(key)
+            if isinstance(envelope, CacheEnvelope):
+                return envelope.value
+            if not cache.get(lease_key):
+                break
+        logger.warning("[SingleFlightLeaseWaitFailed] Key => %s", key)
+        return self._load(key, loader, set)
+
+    def _load(self, key: str, loader: Callable, set: Callable) -> any:
+        start = time.monotonic()
+        value, timeout = loader()
+        delta = time.monotonic() - start
+        set(key, CacheEnvelope(value, delta, time.time() + timeout), timeout)
+        return value
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,192 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django_redis import get_redis_connection
+
+from core.logger import logger, mysql_logger
+from core.utils import get_hash
+
+FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\bIN \(\?(?:, ?\?)*\)", re.IGNORECASE), "IN (...)"),
+    (re.compile(r"\bVALUES \([^()]*\)(?:, ?\([^()]*\))*", re.IGNORECASE), "VALUES (...)"),
+]
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """
+    normalize statement, literals and placeholders are replaced by "?" and lists are collapsed
+    """
+
+    for (pattern, replacement) in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class SQLProfile:
+    """
+    Statements of One Request
+    {digest: [fingerprint, count, time(ms), slow count]}
+    """
+
+    def __init__(self) -> None:
+        self.statements: Dict[str, list] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            statement = fingerprint(sql)
+            digest = get_hash(statement)
+            stat = self.statements.get(digest)
+            if stat is None:
+                stat = self.statements[digest] = [statement, 0, 0.0, 0]
+            stat[1] += 1
+            stat[2] += duration
+            if duration >= settings.SQL_PROFILER_SLOW_MS:
+                stat[3] += 1
+                if not many:
+                    sql_profiler.explain(digest, sql, params, context["connection"].alias)
+
+
+class SQLProfiler:
+    """
+    Aggregate Sampled Statements of All Workers
+    statements are aggregated in process and flushed to redis hashes keyed by fingerprint digest in background
+    EXPLAIN runs in background only for slow fingerprints not explained recently by any worker
+    """
+
+    key = "sql-profile:{name}"
+    fields = ["statement", "count", "time", "slow", "requests", "explain"]
+    explain_lock_key = "sql-profile-explain:{digest}"
+
+    def __init__(self) -> None:
+        self._pid = None
+        self._data = defaultdict(int)
+        self._statements = {}
+        self._explained = set()
+        self._explain_queue = None
+        self._lock = threading.Lock()
+
+    def record(self, profile: SQLProfile) -> None:
+        self._ensure_started()
+        with self._lock:
+            for (digest, (statement, count, duration, slow)) in profile.statements.items():
+                self._statements[digest] = statement
+                self._data[("count", digest)] += count
+                self._data[("time", digest)] += duration
+                self._data[("slow", digest)] += slow
+                self._data[("requests", digest)] += 1
+
+    def explain(self, digest: str, sql: str, params, alias: str) -> None:
+        if digest in self._explained or not sql.lstrip()[:6].upper() == "SELECT":
+            return
+        self._ensure_started()
+        self._explained.add(digest)
+        try:
+            self._explain_queue.put_nowait((digest, sql, params, alias))
+        except queue.Full:
+            self._explained.discard(digest)
+
+    def _ensure_started(self) -> None:
+        # threads do not survive fork, so start them in each process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._data = defaultdict(int)
+        self._statements = {}
+        self._explained = set()
+        self._explain_queue = queue.Queue(settings.SQL_PROFILER_EXPLAIN_QUEUE_SIZE)
+        threading.Thread(target=self._run_flush, name="sql-profile-flusher", daemon=True).start()
+        threading.Thread(
+            target=self._run_explain, args=(self._explain_queue,), name="sql-profile-explainer", daemon=True
+        ).start()
+
+    def _run_flush(self) -> None:
+        while True:
+            time.sleep(settings.SQL_PROFILER_FLUSH_INTERVAL)
+            with self._lock:
+                data, self._data = self._data, defaultdict(int)
+                statements, self._statements = self._statements, {}
+            if not data:
+                continue
+            try:
+                pipeline = get_redis_connection().pipeline(transaction=False)
+                for (digest, statement) in statements.items():
+                    pipeline.hsetnx(self.key.format(name="statement"), digest, statement)
+                for ((name, digest), value) in data.items():
+                    if isinstance(value, float):
+                        pipeline.hincrbyfloat(self.key.format(name=name), digest, value)
+                    elif value:
+                        pipeline.hincrby(self.key.format(name=name), digest, value)
+                pipeline.execute()
+            except Exception as err:
+                logger.error("[SQLProfileFlushFailed] Statements => %s; Error => %s", len(statements), err)
+
+    def _run_explain(self, statements: queue.Queue) -> None:
+        while True:
+            (digest, sql, params, alias) = statements.get()
+            if not cache.add(self.explain_lock_key.format(digest=digest), 1, settings.SQL_PROFILER_EXPLAIN_TIMEOUT):
+                continue
+            connection = connections[alias]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                    columns = [column[0] for column in cursor.description]
+                    plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                plan = json.dumps(plan, ensure_ascii=False, default=str)
+                get_redis_connection().hset(self.key.format(name="explain"), digest, plan)
+                mysql_logger.info("[SQLProfileExplain] Statement => %s; Plan => %s", fingerprint(sql), plan)
+            except Exception as err:
+                logger.error("[SQLProfileExplainFailed] Statement => %s; Error => %s", fingerprint(sql), err)
+            finally:
+                # connection of this thread is not closed by request signals
+                connection.close()
+
+    def load(self) -> List[dict]:
+        """
+        load statements of all workers
+        """
+
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        for name in self.fields:
+            pipeline.hgetall(self.key.format(name=name))
+        stats = defaultdict(dict)
+        for (name, values) in zip(self.fields, pipeline.execute()):
+            for (digest, value) in values.items():
+                value = value.decode()
+                if name in ("count", "slow", "requests"):
+                    value = int(value)
+                elif name == "time":
+                    value = float(value)
+                elif name == "explain":
+                    value = json.loads(value)
+                stats[digest.decode()][name] = value
+        return [{"digest": digest, **stat} for (digest, stat) in stats.items() if "statement" in stat]
+
+    def reset(self) -> None:
+        get_redis_connection().delete(*[self.key.format(name=name) for name in self.fields])
+        cache.delete_pattern(self.explain_lock_key.format(digest="*"))
+
+
+sql_profiler = SQLProfiler()
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.account.models import User
+from core.cache import VersionedLocalCache
+from core.db import execute_wrapper
+from core.query_budget import QueryCounter
+
+
+class QueryCounterTestCase(TestCase):
+    """
+    repeated statements are reported as n+1 with the project line running them
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usernames = [User.objects.create_user(f"user{i}", f"User{i}", "password").username for i in range(5)]
+
+    def test_repeated(self):
+        counter = QueryCounter()
+        with execute_wrapper(counter):
+            User.objects.count()
+            for username in self.usernames:
+                User.objects.get(username=username)
+        self.assertEqual(counter.count, len(self.usernames) + 1)
+        repeated = counter.repeated(3)
+        self.assertEqual(len(repeated), 1)
+        (statement, count, location) = repeated[0]
+        self.assertEqual(count, len(self.usernames))
+        self.assertTrue(statement.startswith("SELECT"))
+        self.assertRegex(location, r"^- at core/tests\.py:\d+$")
+
+    def test_repeated_under_threshold(self):
+        counter = QueryCounter()
+        with execute_wrapper(counter):
+            for username in self.usernames:
+                User.objects.get(username=username)
+        self.assertEqual(counter.repeated(10), [])
+
+
+class VersionedLocalCacheTestCase(TestCase):
+    """
+    local data is dropped when version in redis changed, including version lost in redis
+    """
+
+    version_key = "test-local-cache-version"
+
+    def setUp(self):
+        cache.delete(self.version_key)
+        self.local_cache = VersionedLocalCache(self.version_key, 10)
+
+    def load(self, value: int) -> dict:
+        return self.local_cache.load(["key", "missing"], lambda keys: {"key": value})
+
+    def test_cached(self):
+        self.assertEqual(self.load(1), {"key": 1, "missing": None})
+        self.assertEqual(self.load(2), {"key": 1, "missing": None})
+
+    def test_bump_version(self):
+        self.load(1)
+        self.local_cache._incr_version()
+        self.assertEqual(self.load(2)["key"], 2)
+
+    def test_version_evicted(self):
+        # version is not restarted after evicted, so it never equals the version of loaded data
+        self.load(1)
+        self.local_cache._incr_version()
+        self.load(2)
+        cache.delete(self.version_key)
+        self.local_cache._incr_version()
+        self.assertEqual(self.load(3)["key"], 3)
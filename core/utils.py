@@ -4,14 +4,16 @@ import random
 import time
 import uuid
 from distutils.util import strtobool as _strtobool
-from hashlib import md5
+from hashlib import blake2b, md5
 from itertools import chain
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
+from django.http import QueryDict
 
 from core.exceptions import AuthTokenInvalid
+from core.model_cache import model_cache
 
 
 def uniq_id(with_time=True) -> str:
@@ -55,7 +57,7 @@ def remove_auth_token(username: str, token: str) -> None:
 
     _username = cache.get(token)
     if _username == username:
-        cache.delete(token)
+        model_cache.delete(token)
     else:
         raise AuthTokenInvalid()
 
@@ -168,3 +170,43 @@ def get_md5(content):
     else:
         m.update(content)
     return m.hexdigest()
+
+
+def get_hash(*contents) -> str:
+    """
+    Get Dict List Hash
+    contents are serialized canonically in one pass into a blake2b hash, dict is ordered by key, list keeps order
+    """
+
+    hasher = blake2b(digest_size=16)
+    for content in contents:
+        _update_hash(hasher, content)
+    return hasher.hexdigest()
+
+
+def _update_hash(hasher: blake2b, content) -> None:
+    # each value is written as type tag, length and content, so different structures will not collide
+    if isinstance(content, str):
+        content = content.encode("utf8")
+        hasher.update(b"s%d:%b" % (len(content), content))
+    elif isinstance(content, QueryDict):
+        items = sorted(content.lists())
+        hasher.update(b"d%d:" % len(items))
+        for (key, values) in items:
+            _update_hash(hasher, key)
+            _update_hash(hasher, values)
+    elif isinstance(content, dict):
+        keys = sorted(content.keys(), key=str)
+        hasher.update(b"d%d:" % len(keys))
+        for key in keys:
+            _update_hash(hasher, str(key))
+            _update_hash(hasher, content[key])
+    elif isinstance(content, (list, tuple)):
+        hasher.update(b"l%d:" % len(content))
+        for item in content:
+            _update_hash(hasher, item)
+    elif isinstance(content, (bytes, bytearray)):
+        hasher.update(b"b%d:%b" % (len(content), content))
+    else:
+        content = repr(content).encode("utf8")
+        hasher.update(b"o%d:%b" % (len(content), content))
@@ -1,17 +1,26 @@
+import asyncio
 import traceback
+from functools import wraps
+from typing import Callable, Union
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotModified
 from rest_framework import mixins
+from rest_framework.exceptions import APIException
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from core.cache import CacheMixin
-from core.logger import logger
+from core.logger import logger, request_logger
 from core.models import RequestMock
+from core.query_budget import QueryBudgetMixin
+from core.renderers import APIRenderer
 from core.utils import get_ip
 
 
-class MainViewSet(CacheMixin, GenericViewSet):
+class MainViewSet(CacheMixin, QueryBudgetMixin, GenericViewSet):
     """
     Base ViewSet
     """
@@ -24,59 +33,90 @@ class MainViewSet(CacheMixin, GenericViewSet):
         self.headers = self.default_response_headers
 
         try:
-            self.initial(request, *args, **kwargs)
-
-            if request.method.lower() in self.http_method_names:
-                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
-            else:
-                handler = self.http_method_not_allowed
-
-            # cache
-            if self.enable_cache:
-                has_cache, cache_data = self.get_cache(request, *args, **kwargs)
-                # has cache, return directly
-                if has_cache:
-                    response = Response(cache_data)
-                # no cache, perform request and set cache
+            with self.check_query_budget(request):
+                self.initial(request, *args, **kwargs)
+                handler = self.get_handler(request)
+                # cache
+                if self.enable_cache:
+                    response = self.get_cached_response(handler, request, *args, **kwargs)
+                # no cache
                 else:
                     response = handler(request, *args, **kwargs)
-                    self.set_cache(response.data, request, *args, **kwargs)
-            # no cache
-            else:
-                response = handler(request, *args, **kwargs)
 
         except Exception as exc:
             response = self.handle_exception(exc)
 
         self.response = self.finalize_response(request, response, *args, **kwargs)
+        self.log_request(request)
+        return self.response
 
-        # Record Request
-        try:
+    def get_handler(self, request: Request) -> Callable:
+        if request.method.lower() in self.http_method_names:
+            return getattr(self, request.method.lower(), self.http_method_not_allowed)
+        return self.http_method_not_allowed
+
+    def get_cached_response(self, handler: Callable, request: Request, *args, **kwargs) -> Response:
+        """
+        get response from cache or handler
+        """
 
-            if hasattr(request, "user") and hasattr(request.user, "username") and hasattr(request.user, "nick_name"):
-                user = f"{request.user.username}({request.user.nick_name})"
-            elif hasattr(request, "user") and hasattr(request.user, "app_code") and hasattr(request.user, "app_name"):
-                user = f"{request.user.app_code}({request.user.app_name})"
-            else:
-                user = str(getattr(request, "user", ""))
-            logger.info(
-                "[RequestLog] User => %s; Path => %s:%s; Request => %s; Response => %s; Extras => %s",
-                user,
-                request.method,
-                request.path,
-                {"params": request.query_params, "body": request.data},
-                self.response.data if hasattr(self.response, "data") else self.response.content,
-                {
-                    "user_agent": request.META.get("HTTP_USER_AGENT", ""),
-                    "ip": get_ip(request),
-                    "referer": request.META.get("HTTP_REFERER", ""),
-                },
-            )
+        responses = []
+
+        def load():
+            responses.append(handler(request, *args, **kwargs))
+            return responses[0].data
+
+        cached = self.fetch_cache(load, request, *args, **kwargs)
+        # client has the same data
+        if self.is_not_modified(request, cached.etag):
+            response = HttpResponseNotModified()
+        # use response if performed
+        elif responses:
+            response = responses[0]
+        # use rendered body from cache, only trace will be rendered
+        elif cached.rendered is not None and isinstance(request.accepted_renderer, APIRenderer):
+            response = Response(cached.rendered)
+        # build from cache
+        else:
+            response = Response(cached.data)
+        response["ETag"] = cached.etag
+        return response
+
+    def log_request(self, request: Request) -> None:
+        """
+        record failed and sampled requests
+        """
 
+        try:
+            if self.response.status_code >= 400 or request_logger.is_sampled(request.path):
+                self.record_request(request)
         except Exception:
             logger.error(traceback.format_exc())
 
-        return self.response
+    def record_request(self, request: Request) -> None:
+        """
+        record request and response, args are dumped in log thread
+        """
+
+        if hasattr(request, "user") and hasattr(request.user, "username") and hasattr(request.user, "nick_name"):
+            user = f"{request.user.username}({request.user.nick_name})"
+        elif hasattr(request, "user") and hasattr(request.user, "app_code") and hasattr(request.user, "app_name"):
+            user = f"{request.user.app_code}({request.user.app_name})"
+        else:
+            user = str(getattr(request, "user", ""))
+        request_logger.info(
+            "[RequestLog] User => %s; Path => %s:%s; Request => %s; Response => %s; Extras => %s",
+            user,
+            request.method,
+            request.path,
+            {"params": request.query_params, "body": request.data},
+            self.response.data if hasattr(self.response, "data") else self.response.content,
+            {
+                "user_agent": request.META.get("HTTP_USER_AGENT", ""),
+                "ip": get_ip(request),
+                "referer": request.META.get("HTTP_REFERER", ""),
+            },
+        )
 
     @classmethod
     def call_action(cls, action: str, request: Request, params: dict = None, *args, **kwargs) -> Response:
@@ -96,6 +136,92 @@ class MainViewSet(CacheMixin, GenericViewSet):
         return handler(view_set, _request, *args, **kwargs).data
 
 
+class AsyncMainViewSet(MainViewSet):
+    """
+    Async Base ViewSet
+    served in event loop only when ASYNC_VIEWS_ENABLED (asgi), otherwise it is a MainViewSet with sync handlers
+    action handler such as "api" can have an async twin "aapi", handlers without twin run in thread
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        # wsgi runs coroutine function view in a new event loop for each request
+        if not settings.ASYNC_VIEWS_ENABLED:
+            return view
+
+        # django runs coroutine function view in event loop
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return wraps(view)(async_view)
+
+    def dispatch(self, request, *args, **kwargs):
+        if settings.ASYNC_VIEWS_ENABLED:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            with self.check_query_budget(request):
+                await self.aperform_authentication(request)
+                # permissions and throttles are sync
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                handler = self.get_handler(request)
+                async_handler = self.get_async_handler(handler)
+                # cache
+                if self.enable_cache:
+                    response = await sync_to_async(self.get_cached_response)(handler, request, *args, **kwargs)
+                # no cache
+                elif async_handler is not None:
+                    response = await async_handler(request, *args, **kwargs)
+                else:
+                    response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        self.log_request(request)
+        return self.response
+
+    def get_async_handler(self, handler: Callable) -> Union[Callable, None]:
+        """
+        async twin of action handler
+        """
+
+        if handler == self.http_method_not_allowed or not getattr(self, "action", None):
+            return None
+        async_handler = getattr(self, f"a{self.action}", None)
+        return async_handler if asyncio.iscoroutinefunction(async_handler) else None
+
+    async def aperform_authentication(self, request: Request) -> None:
+        """
+        authenticate before initial, so that request.user is ready and never loaded in sync
+        """
+
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+
 class CreateMixin(mixins.CreateModelMixin):
     ...
 
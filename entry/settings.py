@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 
@@ -58,6 +59,8 @@ INSTALLED_APPS = [
 
 # MIDDLEWARE
 MIDDLEWARE = [
+    "core.middlewares.AccessLogMiddleware",
+    "core.middlewares.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "core.middlewares.CSRFExemptMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -66,7 +69,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.locale.LocaleMiddleware",
-    "core.middlewares.SQLDebugMiddleware",
+    "core.middlewares.SQLProfilerMiddleware",
 ]
 if DEBUG:
     MIDDLEWARE += ["pyinstrument.middleware.ProfilerMiddleware"]
@@ -94,8 +97,11 @@ TEMPLATES = [
     },
 ]
 
-# WSGI
+# WSGI and ASGI
 WSGI_APPLICATION = "entry.wsgi.application"
+ASGI_APPLICATION = "entry.asgi.application"
+# async view sets are served in event loop, set by entry.asgi, otherwise they run sync
+ASYNC_VIEWS_ENABLED = strtobool(os.getenv("ASYNC_VIEWS_ENABLED", "False"))
 
 # DB and Cache
 DATABASES = {
@@ -119,6 +125,7 @@ CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}",
+        "OPTIONS": {"REDIS_CLIENT_CLASS": "core.metrics.CountedRedis"},
     }
 }
 
@@ -164,6 +171,41 @@ AUTH_TOKEN_NAME = os.getenv("AUTH_TOKEN_NAME", f"{'dev-' if DEBUG else ''}{APP_C
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 LOGGING = get_logging_config_dict(LOG_LEVEL, LOG_DIR)
+# request log is sampled by path prefix, such as {"/iam/check/": 0.01}, error responses are always logged
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "1"))
+REQUEST_LOG_SAMPLE_RATES = json.loads(os.getenv("REQUEST_LOG_SAMPLE_RATES", "{}"))
+REQUEST_LOG_MAX_LENGTH = int(os.getenv("REQUEST_LOG_MAX_LENGTH", "4096"))
+# structured access log is written in batch to json lines segments by a background thread
+ACCESS_LOG_ENABLED = strtobool(os.getenv("ACCESS_LOG_ENABLED", "True"))
+ACCESS_LOG_DIR = os.getenv("ACCESS_LOG_DIR", os.path.join(LOG_DIR, "access"))
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "100"))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.getenv("ACCESS_LOG_FLUSH_INTERVAL", "1"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+# Metrics
+# per view histograms are aggregated in process and flushed to redis in interval (seconds), served at /metrics
+METRICS_ENABLED = strtobool(os.getenv("METRICS_ENABLED", "True"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "servicebus")
+# bearer token required by /metrics, endpoint is disabled if not set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# SQL Profiler
+# statements of sampled requests are aggregated by fingerprint and flushed to redis in interval (seconds)
+SQL_PROFILER_ENABLED = strtobool(os.getenv("SQL_PROFILER_ENABLED", "True"))
+SQL_PROFILER_SAMPLE_RATE = float(os.getenv("SQL_PROFILER_SAMPLE_RATE", "0.01"))
+SQL_PROFILER_FLUSH_INTERVAL = float(os.getenv("SQL_PROFILER_FLUSH_INTERVAL", "10"))
+# select slower than this (ms) is explained in background, once for each fingerprint in timeout (seconds)
+SQL_PROFILER_SLOW_MS = float(os.getenv("SQL_PROFILER_SLOW_MS", "100"))
+SQL_PROFILER_EXPLAIN_TIMEOUT = int(os.getenv("SQL_PROFILER_EXPLAIN_TIMEOUT", str(60 * 60 * 24)))
+SQL_PROFILER_EXPLAIN_QUEUE_SIZE = int(os.getenv("SQL_PROFILER_EXPLAIN_QUEUE_SIZE", "100"))
+
+# Query Budget
+# actions exceeding declared max queries are logged, or raise in strict mode which is set by entry.test_settings
+QUERY_BUDGET_ENABLED = strtobool(os.getenv("QUERY_BUDGET_ENABLED", "True"))
+QUERY_BUDGET_STRICT = strtobool(os.getenv("QUERY_BUDGET_STRICT", "False"))
+# statements repeated at least this times in one request are reported as n+1
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.getenv("QUERY_BUDGET_REPEAT_THRESHOLD", "3"))
 
 # rest_framework
 REST_FRAMEWORK = {
@@ -176,6 +218,10 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ["core.auth.SessionAuthenticate", "core.auth.AuthTokenAuthenticate"],
 }
 
+# Renderer
+# json or orjson, orjson falls back to json when not installed
+JSON_RENDERER_ENGINE = os.getenv("JSON_RENDERER_ENGINE", "orjson")
+
 # User
 AUTH_USER_MODEL = "account.User"
 AUTHENTICATION_BACKENDS = ["apps.account.backends.ModelBackend", "apps.account.backends.TokenBackend"]
@@ -184,6 +230,26 @@ AUTHENTICATION_BACKENDS = ["apps.account.backends.ModelBackend", "apps.account.b
 # enable will spend extra time at app request
 ENCRYPT_APP_SECRET = strtobool(os.getenv("ENCRYPT_APP_SECRET", "False"))
 
+# IAM
+# enable will read permission snapshot from redis, run rebuild_snapshot_cache after enabled
+IAM_SNAPSHOT_CACHE_ENABLED = strtobool(os.getenv("IAM_SNAPSHOT_CACHE_ENABLED", "False"))
+
+# Model Cache
+# process local cache in front of redis for get_cache_instance, invalidated by redis pub/sub
+MODEL_CACHE_LOCAL_ENABLED = strtobool(os.getenv("MODEL_CACHE_LOCAL_ENABLED", "True"))
+MODEL_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_LOCAL_MAX_ENTRIES", "10000"))
+MODEL_CACHE_LOCAL_MAX_BYTES = int(os.getenv("MODEL_CACHE_LOCAL_MAX_BYTES", str(32 * 1024 * 1024)))
+MODEL_CACHE_LOCAL_TIMEOUT = int(os.getenv("MODEL_CACHE_LOCAL_TIMEOUT", "60"))
+# timeout for placeholder of missing instance
+MODEL_CACHE_MISSING_TIMEOUT = int(os.getenv("MODEL_CACHE_MISSING_TIMEOUT", "10"))
+
+# Cache Single Flight
+# lease (seconds) for one process loading a missed key, others wait for it by polling in interval (seconds)
+CACHE_LEASE_TIMEOUT = int(os.getenv("CACHE_LEASE_TIMEOUT", "10"))
+CACHE_LEASE_WAIT_INTERVAL = float(os.getenv("CACHE_LEASE_WAIT_INTERVAL", "0.05"))
+# larger beta refreshes earlier before expired, 0 disables early refresh
+CACHE_XFETCH_BETA = float(os.getenv("CACHE_XFETCH_BETA", "1"))
+
 # Celery
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = False
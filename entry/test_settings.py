@@ -0,0 +1,15 @@
+"""
+settings for tests, run with "python manage.py test --settings entry.test_settings apps core"
+or DJANGO_SETTINGS_MODULE=entry.test_settings for any other runner
+cache of REDIS_DB is cleared by tests
+"""
+
+from entry.settings import *  # noqa
+
+# MIDDLEWARE
+# unhandled exceptions, such as QueryBudgetExceeded, are raised by test client
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware != "core.middlewares.UnHandleExceptionMiddleware"]
+
+# Query Budget
+QUERY_BUDGET_ENABLED = True
+QUERY_BUDGET_STRICT = True